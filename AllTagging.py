@@ -1,13 +1,17 @@
-from sentence_transformers import SentenceTransformer
-import pandas as pd
-import torch
-from sklearn import preprocessing
+import sys
+from functools import lru_cache
 
-DEVICE = "mps" if torch.backends.mps.is_available() else "cuda" if torch.cuda.is_available() else "cpu"
-model = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
-df = pd.read_csv("NicosScrapedData.csv")
+import numpy as np
+from IncrementalTagging import MinMaxStats, TaggingJob, run_full, run_incremental
+from SharedModels import get_device, load_model, get_embedding_store, load_scrape, encode_texts, set_backend_from_argv, set_encode_workers_from_argv, print_cache_reports
+from Thresholds import race_threshold, gender_threshold, greek_life_threshold, lgbtq_threshold, identity_keyword_hits
 
-name_desc = df["Club Name"] + " " + df["Description Excerpt"]
+MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+# Nothing heavy happens at import: the model, scrape and scores are loaded on first use
+# (see get_sim_df) or by main, so the threshold functions import in milliseconds
+
+SCRAPE_CSV = "NicosScrapedData.csv"
+OUTPUT_CSV = "44TagsWithIdentity.csv"
 
 # maybe add lgbtq tag
 all_identities = [
@@ -143,117 +147,63 @@ all_identities = [
     "Theatre Arts",
     "Wine and Viticulture"]
 
-description_embeddings = model.encode(name_desc, show_progress_bar=True, device=DEVICE)
-tags_embedding = model.encode(all_identities, show_progress_bar=True, device=DEVICE)
-
-similarity_matrix = model.similarity(description_embeddings, tags_embedding) # rows are descriptions, columns are tags
-
-min_max_scaler = preprocessing.MinMaxScaler()
-scaled_similarity_matrix = min_max_scaler.fit_transform(similarity_matrix)
-
-sim_df = pd.DataFrame(scaled_similarity_matrix, columns = all_identities)
-sim_df.insert(loc = 0, column = "Club Name", value = df["Club Name"])
-sim_df.insert(loc = 1, column = "links", value = df["tablescraper-selected-row href"])
-sim_df["Description"] = name_desc
+racelist = ["White European Italian", "Black African American", "Native American", "Hispanic", "Asian", "Native Hawaiian or Other Pacific Islander"]
 
-def race_threshold(thresh_value, race_list, dataframe):
-    for index, row in dataframe.iterrows():
-        race_vals = row[race_list].to_list()
-        maximum_race_val = max(race_vals)
-        minimum_race_val = min(race_vals)
-        max_val_index = race_vals.index(maximum_race_val)
 
-        for col in race_list:
-            dataframe.loc[index, col] = 0.0 # MIGHT have to set to 0.5 
+def club_texts(df):
+    return df["Club Name"] + " " + df["Description Excerpt"]
 
-        if minimum_race_val >= thresh_value:
-            for col in race_list:
-                dataframe.loc[index, col] = 1.0
-        
-        elif maximum_race_val >= thresh_value:
-            dataframe.loc[index, race_list[max_val_index]] = 1.0
 
-        elif maximum_race_val < thresh_value:
-            for col in race_list:
-                dataframe.loc[index, col] = 1
+def similarity_scores(df, tags=all_identities):
+    """Raw cosine similarities, rows are descriptions, columns are tags."""
+    model = load_model(MODEL_NAME)
+    embedding_store = get_embedding_store(MODEL_NAME)
+    description_embeddings = encode_texts(MODEL_NAME, club_texts(df), show_progress_bar=True, device=get_device())
+    # Each label is embedded once per model and then read back from the store
+    tags_embedding = embedding_store.encode(model, tags, show_progress_bar=True, device=get_device())
+    return np.asarray(model.similarity(description_embeddings, tags_embedding))
 
 
-def gender_threshold(dataframe, thresh_value):
-    women_list = {"woman", "woman's", "women", "women's", "womens", "sisterhood", "sister", "sisters", "sorority"}
-    men_list = {"man", "man's", "men", "men's", "mens", "brotherhood", "brother", "brothers"}
+def build_scored_df(df, scaled_similarity_matrix):
+    import pandas as pd
 
-    for index, row in dataframe.iterrows():
-        description = row["Description"]
-        found = None
-
-        for word in str(description).lower().split():
-            if word in women_list:
-                found = "woman"
-                break
-            elif word in men_list:
-                found = "man"
-                break
-        
-        if found == "man":
-            dataframe.loc[index, "woman women"] = 0.0
-            dataframe.loc[index, "man men"] = 1.0
-        elif found == "woman":
-            dataframe.loc[index, "woman women"] = 1.0
-            dataframe.loc[index, "man men"] = 0.0
-        else:
-            woman_score = dataframe.loc[index, "woman women"]
-            man_score = dataframe.loc[index, "man men"]
-
-            if (woman_score >= thresh_value and man_score >= thresh_value) or (woman_score < thresh_value and man_score < thresh_value):
-                dataframe.loc[index, "woman women"] = 1.0
-                dataframe.loc[index, "man men"] = 1.0
-            elif woman_score > man_score:
-                dataframe.loc[index, "woman women"] = 1.0
-                dataframe.loc[index, "man men"] = 0.0
-            else:
-                dataframe.loc[index, "woman women"] = 0.0
-                dataframe.loc[index, "man men"] = 1.0
+    sim_df = pd.DataFrame(scaled_similarity_matrix, columns = all_identities)
+    sim_df.insert(loc = 0, column = "Club Name", value = df["Club Name"])
+    sim_df.insert(loc = 1, column = "links", value = df["tablescraper-selected-row href"])
+    sim_df["Description"] = club_texts(df)
 
+    race_threshold(0.6, racelist, sim_df)
+    hits = identity_keyword_hits(sim_df)
+    gender_threshold(sim_df, 0.575, hits)
+    greek_life_threshold(sim_df, hits)
+    lgbtq_threshold(sim_df, 0.65)
+    return sim_df
 
-def greek_life_threshold(dataframe):
-    greek_life_list = {"greek", "fraternity", "sorority", "brotherhood", "sisterhood", "brothers", "sisters",
-                       "alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa",
-                       "lambda", "mu", "nu", "xi", "omicron", "pi", "rho", "sigma", "tau", "upsilon",
-                       "phi", "chi", "psi", "omega"}
 
-    for index, row in dataframe.iterrows():
-        description = row["Description"]
-        found = None
-        for word in str(description).lower().split():
-            if word in greek_life_list:
-                found = "greek"
-                break
+TAGGING_JOB = TaggingJob("AllTagging", MODEL_NAME, SCRAPE_CSV, OUTPUT_CSV, all_identities, club_texts, similarity_scores, build_scored_df)
 
-        if found == "greek":
-            dataframe.loc[index, "Greek"] = 1.0
-        else:
-            dataframe.loc[index, "Greek"] = 0.0
 
-def lgbtq_threshold(dataframe, thresh_value):
-    for index, row in dataframe.iterrows():
-        lgbtq_score = row["lgbtq"]
-        if lgbtq_score >= thresh_value:
-            dataframe.loc[index, "lgbtq"] = 1.0
-        else:
-            dataframe.loc[index, "lgbtq"] = 0.0
+@lru_cache(maxsize=None)
+def get_sim_df():
+    """Scored clubs for SCRAPE_CSV, built on first call (model load + encoding) without writing OUTPUT_CSV."""
+    df = load_scrape(SCRAPE_CSV)
+    similarity_matrix = similarity_scores(df)
+    return build_scored_df(df, MinMaxStats.from_matrix(similarity_matrix).scale(similarity_matrix))
 
 
 def main():
-    racelist = ["White European Italian", "Black African American", "Native American", "Hispanic", "Asian", "Native Hawaiian or Other Pacific Islander"]
-
-    race_threshold(0.6, racelist, sim_df)
-    gender_threshold(sim_df, 0.575)
-    greek_life_threshold(sim_df)
-    lgbtq_threshold(sim_df, 0.65)
-
-    sim_df.to_csv('44TagsWithIdentity.csv', index=False)
-
-    print(f"Device is {DEVICE}")
+    # python AllTagging.py --incremental only re-tags clubs that changed since the last run,
+    # --backend torch-int8/onnx/onnx-int8 swaps the fp32 PyTorch encoder (see Encoders.py),
+    # --workers N encodes the descriptions with N CPU processes
+    set_backend_from_argv(sys.argv)
+    set_encode_workers_from_argv(sys.argv)
+    if "--incremental" in sys.argv:
+        run_incremental(TAGGING_JOB)
+    else:
+        run_full(TAGGING_JOB)
+
+    print_cache_reports()
+    print(f"Device is {get_device()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
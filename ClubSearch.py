@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from AllTagging import MODEL_NAME, SCRAPE_CSV, club_texts
+from EmbeddingCache import text_key
+from SharedModels import (embedding_namespace, encode_texts, get_device, get_embedding_store, load_model, load_scrape,
+                          print_cache_reports, set_backend_from_argv)
+
+# Free-text club search: the student's sentence is encoded with AllTagging's model and looked
+# up in an IVF index over the same (cached) description embeddings the tagging uses.
+
+INDEX_DIR = "club_index"
+KMEANS_ITERATIONS = 20
+# Lists scanned per query; about 0.9 recall@10 against exact search from one campus up to 50k
+# clubs (see benchmark), at well under a millisecond per query on CPU
+NPROBE = 8
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def spherical_kmeans(vectors, n_lists, iterations=KMEANS_ITERATIONS, seed=0):
+    """Unit-length centroids for unit-length vectors, assigned by cosine (dot product)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        similarities = vectors @ centroids.T
+        assignment = similarities.argmax(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = np.bincount(assignment, minlength=n_lists) == 0
+        if empty.any():
+            # Restart empty lists at the vectors their current centroid fits worst
+            worst = np.argsort(similarities[np.arange(len(vectors)), assignment])[:empty.sum()]
+            sums[empty] = vectors[worst]
+        centroids = normalize_rows(sums)
+    return centroids, (vectors @ centroids.T).argmax(axis=1)
+
+
+class IVFIndex:
+    """
+    Inverted-file index over unit-length vectors. Vectors are clustered into n_lists lists by
+    spherical k-means and stored contiguously list by list, so a query scores the centroids,
+    then only the vectors of its nprobe closest lists.
+    Persisted as .npy files under path and memory-mapped on load.
+    """
+
+    def __init__(self, centroids, vectors, rows, offsets, key):
+        self.centroids = centroids
+        self.vectors = vectors  # sorted by list
+        self.rows = rows        # original row of each sorted vector
+        self.offsets = offsets  # list i is vectors[offsets[i]:offsets[i + 1]]
+        self.key = key
+
+    @classmethod
+    def build(cls, vectors, key, n_lists=None, seed=0):
+        vectors = normalize_rows(vectors)
+        n_lists = min(n_lists or max(1, int(np.sqrt(len(vectors)))), len(vectors))
+        centroids, assignment = spherical_kmeans(vectors, n_lists, seed=seed)
+        rows = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        return cls(centroids, np.ascontiguousarray(vectors[rows]), rows, offsets, key)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in ("centroids", "vectors", "rows", "offsets"):
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"key": self.key, "lists": len(self.centroids), "vectors": len(self.vectors)}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+            key = json.load(f)["key"]
+        arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                  for name in ("centroids", "vectors", "rows", "offsets")]
+        return cls(*arrays, key)
+
+    def search(self, query, k=10, nprobe=NPROBE):
+        """(rows, cosine similarities) of the k best vectors in the nprobe closest lists, best first."""
+        query = normalize_rows(query).ravel()
+        nprobe = min(nprobe, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        candidates = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+        similarities = self.vectors[candidates] @ query
+        k = min(k, len(candidates))
+        best = np.argpartition(-similarities, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+        best = best[np.lexsort((self.rows[candidates[best]], -similarities[best]))]
+        return np.asarray(self.rows[candidates[best]]), similarities[best]
+
+
+def exact_search(vectors, query, k=10):
+    """Brute-force cosine top k over unit-length vectors, the recall reference for IVFIndex."""
+    similarities = vectors @ normalize_rows(query).ravel()
+    best = np.lexsort((np.arange(len(similarities)), -similarities))[:k]
+    return best, similarities[best]
+
+
+class ClubSearch:
+    """
+    Free-text search over the clubs in SCRAPE_CSV. The index is rebuilt only when the set of
+    club descriptions (or the model/backend) changes; otherwise it's memory-mapped from disk.
+    """
+
+    def __init__(self, scrape_csv=SCRAPE_CSV, model_name=MODEL_NAME, index_dir=INDEX_DIR):
+        self.model_name = model_name
+        self.clubs = load_scrape(scrape_csv)
+        texts = list(club_texts(self.clubs))
+        namespace = embedding_namespace(model_name)
+        key = hashlib.sha1("\n".join(text_key(namespace, text) for text in texts).encode("utf-8")).hexdigest()
+
+        path = os.path.join(index_dir, namespace.replace("/", "__"))
+        index = IVFIndex.load(path) if os.path.exists(os.path.join(path, "index.json")) else None
+        if index is None or index.key != key:
+            print(f"Building the club search index for {len(texts)} clubs")
+            index = IVFIndex.build(encode_texts(model_name, texts, device=get_device()), key)
+            index.save(path)
+            index = IVFIndex.load(path)
+        self.index = index
+
+    def encode_query(self, text):
+        # Repeated phrases ("robotics", "dance") come from the store's in-memory LRU; queries
+        # aren't written to disk
+        store = get_embedding_store(self.model_name)
+        return store.encode(load_model(self.model_name), [text], persist=False, device=get_device())[0]
+
+    def search(self, text, k=10, nprobe=NPROBE):
+        """[(club name, link, similarity), ...] for a student's free-text description, best first."""
+        rows, similarities = self.index.search(self.encode_query(text), k, nprobe)
+        return [(self.clubs["Club Name"].iloc[row], self.clubs["tablescraper-selected-row href"].iloc[row], float(similarity))
+                for row, similarity in zip(rows, similarities)]
+
+
+def benchmark(index, queries, k=10, nprobes=(1, 2, 4, 8, 16, 32, 64)):
+    """
+    Recall@k against exact search and p50/p99 latency per query (encode excluded) for each
+    nprobe. Returns {nprobe: (recall, p50 ms, p99 ms)}.
+    """
+    exact_vectors = np.empty_like(index.vectors)
+    exact_vectors[index.rows] = index.vectors
+    truth = [set(exact_search(exact_vectors, query, k)[0]) for query in queries]
+
+    results = {}
+    for nprobe in nprobes:
+        if nprobe > len(index.centroids):
+            break
+        found, latencies = 0, []
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            rows, _ = index.search(query, k, nprobe)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found += len(expected.intersection(rows))
+        results[nprobe] = (found / sum(map(len, truth)), np.percentile(latencies, 50), np.percentile(latencies, 99))
+        print(f"nprobe {nprobe:3d}/{len(index.centroids)}: recall@{k} {results[nprobe][0]:.3f}, "
+              f"p50 {results[nprobe][1]:.3f} ms, p99 {results[nprobe][2]:.3f} ms")
+    return results
+
+
+def synthetic_corpus(vectors, clubs, seed=0):
+    """clubs noisy copies of the real description embeddings, to benchmark at multi-campus scale."""
+    rng = np.random.default_rng(seed)
+    base = normalize_rows(vectors)[rng.integers(0, len(vectors), clubs)]
+    return normalize_rows(base + rng.normal(0, 0.05, base.shape).astype(np.float32))
+
+
+def main():
+    # python ClubSearch.py "I want to build robots with friends"   search
+    # python ClubSearch.py --benchmark [--clubs 50000]              recall/latency vs exact search, with
+    #                                                               AllTagging's tag labels as queries
+    set_backend_from_argv(sys.argv)
+    args = sys.argv[1:]
+    for flag in ("--backend", "--clubs"):
+        if flag in args:
+            del args[args.index(flag):args.index(flag) + 2]
+
+    search = ClubSearch()
+    if "--benchmark" in args:
+        from AllTagging import all_identities
+
+        index = search.index
+        if "--clubs" in sys.argv:
+            clubs = int(sys.argv[sys.argv.index("--clubs") + 1])
+            vectors = np.empty_like(index.vectors)
+            vectors[index.rows] = index.vectors
+            index = IVFIndex.build(synthetic_corpus(vectors, clubs), key=None)
+        benchmark(index, encode_texts(MODEL_NAME, all_identities, device=get_device()))
+        return
+
+    query = " ".join(arg for arg in args if not arg.startswith("--")) or "I like building robots"
+    for club_name, link, similarity in search.search(query):
+        print(f"{similarity:.4f}  {club_name}  {link}")
+    print_cache_reports()
+
+if __name__ == "__main__":
+    main()
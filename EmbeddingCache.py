@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+from Encoders import bucketed_encode, pool_encode
+
+CACHE_DIR = "embedding_cache"
+# Embeddings each store keeps in process memory (~12 MB of 768-dim float32), least recently used evicted first
+MEMORY_CACHE_ITEMS = 4096
+
+
+def normalize_text(text):
+    """Collapses whitespace so re-scrapes that only reflow a description hit the cache."""
+    return " ".join(str(text).split())
+
+
+def text_key(model_name, text):
+    return hashlib.sha1(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingLRU:
+    """Size-bounded in-process LRU of key -> embedding, in front of an EmbeddingStore's shards."""
+
+    def __init__(self, max_items=MEMORY_CACHE_ITEMS):
+        self.max_items = max_items
+        self.items = OrderedDict()
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key):
+        embedding = self.items.get(key)
+        if embedding is not None:
+            self.items.move_to_end(key)
+        return embedding
+
+    def put(self, key, embedding):
+        self.items[key] = embedding
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+
+class EmbeddingStore:
+    """
+    Content-addressed embedding store shared by the tagging scripts.
+
+    Every embedding is keyed by sha1(model name + normalized text). Each batch of new
+    embeddings is written as its own float32 .npy shard and read back memory-mapped, so
+    only texts that were never seen before go through model.encode.
+    Layout: <cache_dir>/<model name>/index.json + shard-<pid>-<random>.npy, ...
+    Several processes can add to one store at once (the scripts sharing a model, a ClubSearch
+    process next to a tagging run): shard names are unique and index.json is merged under a
+    lock, never rewritten from a stale view.
+
+    encode also keeps the most recently used embeddings in memory (EmbeddingLRU), so repeated
+    texts in one process (tag labels shared by the pipeline's scripts, common search phrases)
+    don't even touch the shards. memory_hits / disk_hits / misses count where each distinct
+    text of every encode call came from; encode_seconds is the time spent in model.encode.
+    """
+
+    def __init__(self, model_name, cache_dir=CACHE_DIR, memory_items=MEMORY_CACHE_ITEMS):
+        self.model_name = model_name
+        self.path = os.path.join(cache_dir, model_name.replace("/", "__"))
+        self.index_path = os.path.join(self.path, "index.json")
+        self.dim = None
+        self.shard_files = []
+        self.keys = {}  # key -> [shard number, row in shard]
+        self._shards = {}
+        self.memory = EmbeddingLRU(memory_items)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+
+        self._read_index()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, text):
+        return text_key(self.model_name, text) in self.keys
+
+    def _shard(self, shard_number):
+        if shard_number not in self._shards:
+            shard_path = os.path.join(self.path, self.shard_files[shard_number])
+            self._shards[shard_number] = np.load(shard_path, mmap_mode="r")
+        return self._shards[shard_number]
+
+    def _read_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            self.dim = index["dim"]
+            self.shard_files = index["shards"]
+            self.keys = index["keys"]
+
+    @contextmanager
+    def _index_lock(self):
+        import fcntl
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.index_path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # released when the file closes, even if the process dies
+            yield
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "shards": self.shard_files, "keys": self.keys}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _check_dim(self, dim):
+        if self.dim is None:
+            self.dim = int(dim)
+        elif dim != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim embeddings for {self.model_name}, got {dim}")
+
+    def _next_shard_file(self):
+        """A new shard name no other process can pick; the empty file is created to claim it."""
+        os.makedirs(self.path, exist_ok=True)
+        shard_file = f"shard-{os.getpid()}-{uuid.uuid4().hex[:12]}.npy"
+        with open(os.path.join(self.path, shard_file), "x"):
+            pass
+        return shard_file
+
+    def _register_shard(self, shard_file, keys):
+        """
+        Adds shard_file to index.json. The index is re-read under the lock first, so shards
+        other processes registered since this one last read it are kept. Every writer only
+        appends, so the shard numbers this process already holds stay valid.
+        """
+        with self._index_lock():
+            self._read_index()
+            shard_number = len(self.shard_files)
+            self.shard_files.append(shard_file)
+            for shard_row, key in enumerate(keys):
+                # Another process may have stored the same text meanwhile; either row is fine
+                self.keys.setdefault(key, [shard_number, shard_row])
+            self._save_index()
+
+    def add(self, texts, embeddings):
+        """Writes the embeddings of texts that aren't stored yet as a new shard."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        new_rows = {}
+        for row, text in enumerate(texts):
+            key = text_key(self.model_name, text)
+            if key not in self.keys and key not in new_rows:
+                new_rows[key] = row
+        if not new_rows:
+            return
+
+        self._check_dim(embeddings.shape[1])
+        shard_file = self._next_shard_file()
+        shard = np.lib.format.open_memmap(os.path.join(self.path, shard_file), mode="w+",
+                                          dtype=np.float32, shape=(len(new_rows), self.dim))
+        shard[:] = embeddings[list(new_rows.values())]
+        shard.flush()
+        del shard
+        self._register_shard(shard_file, new_rows)
+
+    def get(self, texts):
+        """Returns a (len(texts), dim) float32 array. Every text must already be stored."""
+        return self._get_keys([text_key(self.model_name, text) for text in texts])
+
+    def _get_keys(self, keys):
+        out = np.empty((len(keys), self.dim or 0), dtype=np.float32)
+        rows_by_shard = {}
+        for position, key in enumerate(keys):
+            shard_number, shard_row = self.keys[key]
+            rows_by_shard.setdefault(shard_number, ([], []))
+            rows_by_shard[shard_number][0].append(position)
+            rows_by_shard[shard_number][1].append(shard_row)
+
+        for shard_number, (positions, shard_rows) in rows_by_shard.items():
+            out[positions] = self._shard(shard_number)[shard_rows]
+        return out
+
+    def _lookup(self, keys, texts):
+        """
+        (found, missing) for one encode call: found maps the key of each distinct text in
+        memory or on disk to its embedding, missing maps the other keys to their text. Counts
+        each as a memory hit, disk hit or miss.
+        """
+        found = {}
+        on_disk = []
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            embedding = self.memory.get(key)
+            if embedding is not None:
+                found[key] = embedding
+            elif key in self.keys:
+                found[key] = None
+                on_disk.append(key)
+            else:
+                missing[key] = text
+        self.memory_hits += len(found) - len(on_disk)
+        self.disk_hits += len(on_disk)
+        self.misses += len(missing)
+
+        if on_disk:
+            for key, embedding in zip(on_disk, self._get_keys(on_disk)):
+                found[key] = embedding.copy()  # a row view would keep the whole batch alive in the LRU
+        return found, missing
+
+    def _collect(self, keys, found):
+        """Puts every embedding of the call in the memory LRU and returns them in the order of keys."""
+        for key, embedding in found.items():
+            self.memory.put(key, embedding)
+        if not keys:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def encode(self, model, texts, persist=True, **encode_kwargs):
+        """
+        Drop-in for model.encode(texts, ...) that only encodes texts found neither in memory
+        nor in the store, in token-budgeted batches (see Encoders.bucketed_encode). With
+        persist=False (one-off search queries) new embeddings only go to the memory LRU
+        instead of a new shard.
+        """
+        texts = list(texts)
+        keys = [text_key(self.model_name, text) for text in texts]
+        found, missing = self._lookup(keys, texts)
+        if missing:
+            if len(missing) > 1:
+                print(f"Encoding {len(missing)} new texts with {self.model_name}, the other {len(texts) - len(missing)} come from the cache")
+            missing_texts = list(missing.values())
+            start = time.perf_counter()
+            embeddings = np.asarray(bucketed_encode(model, missing_texts, report=len(missing) > 1, **encode_kwargs), dtype=np.float32)
+            self.encode_seconds += time.perf_counter() - start
+            if persist:
+                self.add(missing_texts, embeddings)
+            found.update((key, embedding.copy()) for key, embedding in zip(missing, embeddings))
+        return self._collect(keys, found)
+
+    def report(self):
+        requested = self.memory_hits + self.disk_hits + self.misses
+        return (f"{self.model_name}: {requested} texts, {self.memory_hits} from memory, {self.disk_hits} from disk, "
+                f"{self.misses} encoded in {self.encode_seconds:.1f}s")
+
+    def encode_with_pool(self, model_name, texts, backend="torch", workers=None, pool=None, **encode_kwargs):
+        """
+        Like encode (same memory LRU and counters), but the missing texts are encoded by a pool
+        of worker processes that write straight into the new shard's memory map (see
+        Encoders.pool_encode). pool is an open Encoders.EncoderPool to reuse across calls.
+        """
+        texts = list(texts)
+        keys = [text_key(self.model_name, text) for text in texts]
+        found, missing = self._lookup(keys, texts)
+        if missing:
+            print(f"Encoding {len(missing)} new texts with {self.model_name} in a worker pool, "
+                  f"the other {len(texts) - len(missing)} come from the cache")
+            shard_file = self._next_shard_file()
+            start = time.perf_counter()
+            shard = pool_encode(model_name, list(missing.values()), os.path.join(self.path, shard_file),
+                                backend, workers, pool=pool, **encode_kwargs)
+            self.encode_seconds += time.perf_counter() - start
+            self._check_dim(shard.shape[1])
+            found.update((key, np.array(embedding)) for key, embedding in zip(missing, shard))
+            del shard
+            self._register_shard(shard_file, missing)
+        return self._collect(keys, found)
@@ -0,0 +1,298 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# torch / sentence_transformers / onnxruntime are imported inside the loaders so that picking
+# a backend doesn't drag in the others
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+ONNX_DIR = "onnx_models"
+ONNX_QUANTIZATION = "avx2"  # runs on any x86-64 CPU we tag on; "avx512_vnni" is faster where supported
+
+# Padded tokens per encode batch: 32 texts at mpnet's 384-token limit is ~12k, so a batch of
+# one-line blurbs holds a few hundred texts while a batch of long descriptions stays small
+TOKEN_BUDGET = 16384
+
+# Texts per pool task: big enough to amortize the task hand-off, small enough to spread the
+# tail of a large corpus over all workers
+POOL_CHUNK_SIZE = 1024
+
+
+def load_encoder(model_name, backend="torch", threads=None):
+    """
+    SentenceTransformer for model_name running on the given backend:
+        torch       plain PyTorch, fp32 (what the scripts always used)
+        torch-int8  PyTorch with the Linear layers dynamically quantized to int8, CPU only
+        onnx        ONNX Runtime export of the same model, fp32
+        onnx-int8   ONNX Runtime with int8 dynamic quantization
+    The ONNX exports are written once under ONNX_DIR and reused. threads caps the ONNX Runtime
+    session's intra-op threads (by default it takes every core).
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+
+    if backend == "torch-int8":
+        import torch
+
+        model = SentenceTransformer(model_name, device="cpu")
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        return model
+
+    local_path = os.path.join(ONNX_DIR, model_name.replace("/", "__"))
+    if not os.path.exists(os.path.join(local_path, "onnx", "model.onnx")):
+        # First use: export from the hub checkpoint and keep a local copy to quantize next to
+        SentenceTransformer(model_name, backend="onnx").save(local_path)
+
+    model_kwargs = {}
+    if threads:
+        import onnxruntime
+
+        model_kwargs["session_options"] = onnxruntime.SessionOptions()
+        model_kwargs["session_options"].intra_op_num_threads = threads
+
+    if backend == "onnx":
+        return SentenceTransformer(local_path, backend="onnx", model_kwargs=model_kwargs)
+
+    quantized_file = f"model_qint8_{ONNX_QUANTIZATION}.onnx"
+    if not os.path.exists(os.path.join(local_path, "onnx", quantized_file)):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        export_dynamic_quantized_onnx_model(SentenceTransformer(local_path, backend="onnx"), ONNX_QUANTIZATION, local_path)
+    return SentenceTransformer(local_path, backend="onnx", model_kwargs={**model_kwargs, "file_name": f"onnx/{quantized_file}"})
+
+
+def token_lengths(model, texts):
+    """Token count of each text as the model sees it (special tokens included, truncated to max_seq_length)."""
+    # model.encode tokenizes str(text), so a NaN description (a club with none) is "nan" here
+    # too; the fast tokenizers raise TypeError on anything but strings
+    texts = [str(text) for text in texts]
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        return np.array([len(text.split()) + 2 for text in texts], dtype=np.int64)
+    max_length = getattr(model, "max_seq_length", None)
+    input_ids = tokenizer(texts, add_special_tokens=True, truncation=max_length is not None, max_length=max_length)["input_ids"]
+    return np.array([len(ids) for ids in input_ids], dtype=np.int64)
+
+
+def token_budget_batches(lengths, token_budget=TOKEN_BUDGET):
+    """
+    Splits text positions, longest first, into batches whose padded size (texts x longest
+    text in the batch) stays within token_budget. Returns a list of position arrays.
+    """
+    order = np.argsort(-lengths, kind="stable")
+    batches = []
+    start = 0
+    while start < len(order):
+        # order is longest first, so the batch's first text sets its padded length
+        batch_size = max(1, token_budget // max(int(lengths[order[start]]), 1))
+        batches.append(order[start:start + batch_size])
+        start += batch_size
+    return batches
+
+
+def bucketed_encode(model, texts, token_budget=TOKEN_BUDGET, show_progress_bar=False, report=True, **encode_kwargs):
+    """
+    Drop-in for model.encode(texts, ...) that groups texts of similar token length and sizes
+    each batch by token_budget instead of a fixed count, so short blurbs aren't padded out to
+    the longest description. Embeddings come back in the order of texts.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.asarray(model.encode(texts, **encode_kwargs))
+
+    lengths = token_lengths(model, texts)
+    batches = token_budget_batches(lengths, token_budget)
+    if show_progress_bar:
+        from tqdm import tqdm
+
+        batches = tqdm(batches, desc="Batches")
+
+    out = None
+    padded_tokens = 0
+    start = time.perf_counter()
+    for positions in batches:
+        embeddings = np.asarray(model.encode([texts[p] for p in positions], batch_size=len(positions),
+                                             show_progress_bar=False, **encode_kwargs))
+        if out is None:
+            out = np.empty((len(texts), embeddings.shape[1]), dtype=embeddings.dtype)
+        out[positions] = embeddings
+        padded_tokens += len(positions) * int(lengths[positions].max())
+    seconds = time.perf_counter() - start
+
+    tokens = int(lengths.sum())
+    if report:
+        print(f"Encoded {len(texts)} texts ({tokens} tokens, {1 - tokens / padded_tokens:.0%} padding) "
+              f"in {len(batches)} batches: {tokens / seconds:,.0f} tokens/s")
+    return out
+
+
+# The model each pool worker loaded in _init_pool_worker
+_pool_model = None
+
+
+def _init_pool_worker(model_name, backend, threads):
+    global _pool_model
+    # Otherwise every worker runs a thread per core
+    if backend.startswith("torch"):
+        import torch
+
+        torch.set_num_threads(threads)
+        _pool_model = load_encoder(model_name, backend)
+    else:
+        _pool_model = load_encoder(model_name, backend, threads)
+
+
+def _pool_dim():
+    return int(_pool_model.get_sentence_embedding_dimension())
+
+
+def _pool_encode_chunk(task):
+    out_path, start, texts, encode_kwargs = task
+    embeddings = bucketed_encode(_pool_model, texts, report=False, device="cpu", **encode_kwargs)
+    out = np.load(out_path, mmap_mode="r+")
+    out[start:start + len(texts)] = embeddings
+    out.flush()
+    return len(texts)
+
+
+class EncoderPool:
+    """
+    The worker processes pool_encode runs on, kept open across pool_encode calls so each worker
+    loads the model once for the pool's lifetime rather than once per call (StreamingTagging
+    encodes chunk by chunk). The processes start on first use. Use as a context manager.
+    """
+
+    def __init__(self, model_name, backend="torch", workers=None):
+        self.model_name = model_name
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        self.dim = None
+
+    def start(self):
+        if self.pool is None:
+            import multiprocessing
+
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            # spawn rather than fork: forking a process that already initialized torch can deadlock
+            self.pool = multiprocessing.get_context("spawn").Pool(self.workers, _init_pool_worker,
+                                                                  (self.model_name, self.backend, threads))
+            self.dim = self.pool.apply(_pool_dim)
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def pool_encode(model_name, texts, out_path, backend="torch", workers=None, chunk_size=POOL_CHUNK_SIZE, pool=None,
+                **encode_kwargs):
+    """
+    Encodes texts with `workers` CPU processes (default: one per core), each loading the
+    model once. Workers take chunk_size texts at a time and write their embeddings straight
+    into a float32 .npy memory map at out_path, so the parent never holds the corpus'
+    embeddings in memory. Returns that memory map, read-only, rows in the order of texts.
+    pool is an open EncoderPool for model_name and backend to reuse; without one, a pool is
+    started for this call only.
+    """
+    if pool is None:
+        with EncoderPool(model_name, backend, workers) as pool:
+            return pool_encode(model_name, texts, out_path, backend, workers, chunk_size, pool, **encode_kwargs)
+
+    texts = list(texts)
+    # The pool does its own batching and CPU placement
+    encode_kwargs.pop("show_progress_bar", None)
+    encode_kwargs.pop("device", None)
+
+    start_time = time.perf_counter()
+    workers = pool.start()
+    out = np.lib.format.open_memmap(out_path, mode="w+", dtype=np.float32, shape=(len(texts), pool.dim))
+    del out  # the header and zeroed rows are on disk, workers fill the rows in place
+
+    tasks = [(out_path, start, texts[start:start + chunk_size], encode_kwargs)
+             for start in range(0, len(texts), chunk_size)]
+    done = 0
+    for encoded in workers.imap_unordered(_pool_encode_chunk, tasks):
+        done += encoded
+        print(f"Encoded {done}/{len(texts)} texts", end="\r")
+    seconds = time.perf_counter() - start_time
+    print(f"Encoded {len(texts)} texts with {pool.workers} workers in {seconds:.1f}s ({len(texts) / seconds:,.0f} texts/s)")
+    return np.load(out_path, mmap_mode="r")
+
+
+def timed_encode(model, texts, **encode_kwargs):
+    """Returns (embeddings, seconds) for one model.encode call, bypassing the embedding cache."""
+    start = time.perf_counter()
+    embeddings = model.encode(list(texts), **encode_kwargs)
+    return np.asarray(embeddings), time.perf_counter() - start
+
+
+def parity_check(job, backend, scrape_df):
+    """
+    Scores scrape_df with job's model on plain torch and on backend and reports how many 0/1
+    tag decisions flip (columns that are all 0/1 in the fp32 output, i.e. the thresholded
+    identity tags) and how far the continuous tag scores move, plus the encode speedup.
+    """
+    from IncrementalTagging import MinMaxStats
+
+    texts = job.club_texts(scrape_df)
+    outputs = {}
+    seconds = {}
+    for name in ("torch", backend):
+        model = load_encoder(job.model_name, name)
+        description_embeddings, seconds[name] = timed_encode(model, texts, device="cpu")
+        tags_embedding, _ = timed_encode(model, job.tags, device="cpu")
+        raw_similarity = np.asarray(model.similarity(description_embeddings, tags_embedding))
+        outputs[name] = job.build_scored_df(scrape_df, MinMaxStats.from_matrix(raw_similarity).scale(raw_similarity))
+
+    reference = outputs["torch"].select_dtypes("number").to_numpy(dtype=np.float64)
+    candidate = outputs[backend].select_dtypes("number").to_numpy(dtype=np.float64)
+    decision_columns = np.isin(reference, (0.0, 1.0)).all(axis=0)
+    flips = (reference[:, decision_columns] != candidate[:, decision_columns])
+    score_diff = np.abs(reference[:, ~decision_columns] - candidate[:, ~decision_columns])
+
+    report = {
+        "job": job.name,
+        "backend": backend,
+        "decisions": int(flips.size),
+        "flipped_decisions": int(flips.sum()),
+        "clubs_with_a_flip": int(flips.any(axis=1).sum()),
+        "max_score_diff": float(score_diff.max()) if score_diff.size else 0.0,
+        "mean_score_diff": float(score_diff.mean()) if score_diff.size else 0.0,
+        "torch_encode_seconds": seconds["torch"],
+        "backend_encode_seconds": seconds[backend],
+        "speedup": seconds["torch"] / seconds[backend],
+    }
+    print(f"{job.name} on {backend}: {report['flipped_decisions']} of {report['decisions']} 0/1 decisions flipped "
+          f"({report['clubs_with_a_flip']} clubs), continuous scores moved by at most {report['max_score_diff']:.4f} "
+          f"(mean {report['mean_score_diff']:.4f}), encoding {report['speedup']:.1f}x faster than fp32 torch")
+    return report
+
+
+def main():
+    # python Encoders.py onnx-int8 compares every tagging job's output on that backend with fp32 torch
+    backend = sys.argv[1] if len(sys.argv) > 1 else "onnx-int8"
+
+    from SharedModels import load_scrape
+    from TaggingPipeline import JOBS
+
+    for job in JOBS:
+        parity_check(job, backend, load_scrape(job.scrape_csv))
+
+if __name__ == "__main__":
+    main()
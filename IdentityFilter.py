@@ -0,0 +1,115 @@
+import sys
+
+import numpy as np
+
+from AllTagging import OUTPUT_CSV, all_identities, racelist
+
+# The identity block of AllTagging's output. The thresholds leave these columns exactly 0/1:
+# race_threshold and gender_threshold mark every group a club is open to (all 1s for a club
+# that isn't specific), greek_life_threshold and lgbtq_threshold mark clubs that are about it.
+GENDER_COLUMNS = ["woman women", "man men"]
+RACE_COLUMNS = list(racelist)
+OPT_IN_COLUMNS = ["Greek", "lgbtq"]
+IDENTITY_COLUMNS = GENDER_COLUMNS + RACE_COLUMNS + OPT_IN_COLUMNS
+
+# The interest tags are everything before the identity section of all_identities
+INTEREST_COLUMNS = all_identities[:all_identities.index(GENDER_COLUMNS[0])]
+
+# The app sends 'other' for both "Maybe" and "No" on the opt-in questions (and nothing for a
+# skipped one), so those never drop a club; only an explicit opt-out such as "no Greek" does.
+# Keyword-flagged Greek clubs include honor and professional societies, so excluding them on
+# anything weaker than a clear "No" would hide clubs the user may want.
+OPT_OUT_PREFIX = "no "
+
+# Same weights the web app gives a selected identity column when ranking
+IDENTITY_BOOST = 2.0
+GREEK_BOOST = 1.0
+
+
+def identity_masks(selected):
+    """
+    Turns identity answers (the app's values, e.g. ["man men", "Asian", "Computer Science",
+    "other", "Greek"]) into boolean masks over IDENTITY_COLUMNS:
+        required  the user's gender and race; a club must be open to them (column == 1)
+        excluded  opt-in identities the user explicitly declined ("no Greek", "no lgbtq");
+                  clubs about them are dropped
+    A user with no answers gets two all-False masks, so every club is eligible.
+    """
+    selected = set(selected)
+    declined = [value[len(OPT_OUT_PREFIX):] for value in selected if value.startswith(OPT_OUT_PREFIX)]
+    columns = np.array(IDENTITY_COLUMNS)
+    required = np.isin(columns, GENDER_COLUMNS + RACE_COLUMNS) & np.isin(columns, list(selected))
+    excluded = np.isin(columns, OPT_IN_COLUMNS) & np.isin(columns, declined)
+    return required, excluded
+
+
+class IdentityFilter:
+    """
+    Identity prefilter in front of interest ranking over a scored clubs matrix (a ScoreArtifact
+    of AllTagging's output, or the output DataFrame). Clubs failing the user's identity masks
+    are dropped with one vectorized all/any over the 0/1 block; cosine ranking then only
+    touches the clubs that are left.
+    """
+
+    def __init__(self, scores, columns, club_names):
+        self.columns = list(columns)
+        positions = {}
+        for position, column in enumerate(self.columns):
+            positions.setdefault(column, position)
+        self.positions = positions
+        self.scores = scores
+        self.club_names = np.asarray(club_names, dtype=object)
+        self.identity_block = np.asarray(scores[:, [positions[column] for column in IDENTITY_COLUMNS]]) == 1
+
+    @classmethod
+    def from_artifact(cls, artifact):
+        return cls(artifact.scores, artifact.score_columns, artifact.metadata["Club Name"])
+
+    @classmethod
+    def from_dataframe(cls, scored_df):
+        numeric = scored_df.select_dtypes("number")
+        return cls(numeric.to_numpy(dtype=np.float32), numeric.columns, scored_df["Club Name"])
+
+    def eligible(self, selected):
+        """Boolean mask of clubs open to a user with these identity answers."""
+        required, excluded = identity_masks(selected)
+        return self.identity_block[:, required].all(axis=1) & ~self.identity_block[:, excluded].any(axis=1)
+
+    def rank(self, interest_scores, selected, k=10):
+        """
+        Top k eligible clubs for a user: cosine over INTEREST_COLUMNS (interest_scores, in that
+        order) plus the identity columns they picked (boosted like the app does, which also
+        covers the religion and major columns that aren't 0/1). Returns (club name, similarity)
+        pairs, best first; ties keep CSV order.
+        """
+        rows = np.flatnonzero(self.eligible(selected))
+        boosted = [column for column in dict.fromkeys(selected)
+                   if column in self.positions and column not in INTEREST_COLUMNS and column not in GENDER_COLUMNS + RACE_COLUMNS]
+        user = np.concatenate([np.asarray(interest_scores, dtype=np.float32),
+                               [GREEK_BOOST if column == "Greek" else IDENTITY_BOOST for column in boosted]]).astype(np.float32)
+        clubs = np.asarray(self.scores[np.ix_(rows, [self.positions[column] for column in INTEREST_COLUMNS + boosted])],
+                           dtype=np.float32)
+
+        norms = np.linalg.norm(clubs, axis=1) * np.linalg.norm(user)
+        norms[norms == 0] = 1
+        similarities = clubs @ user / norms
+        best = np.argsort(-similarities, kind="stable")[:k]
+        return [(self.club_names[rows[i]], float(similarities[i])) for i in best]
+
+
+def main():
+    # python IdentityFilter.py "man men" Asian "Computer Science" "no Greek" --likes "Technology,Robotics & AI"
+    from ScoreArtifact import ScoreArtifact
+
+    likes = sys.argv[sys.argv.index("--likes") + 1].split(",") if "--likes" in sys.argv else []
+    selected = [arg for arg in sys.argv[1:] if not arg.startswith("--") and arg != ",".join(likes)]
+    interest_scores = [1.0 if column in likes else 0.0 for column in INTEREST_COLUMNS]
+
+    identity_filter = IdentityFilter.from_artifact(ScoreArtifact(OUTPUT_CSV))
+    eligible = identity_filter.eligible(selected)
+    print(f"{eligible.sum()} of {len(eligible)} clubs are open to {', '.join(selected) or 'anyone'}")
+    for club_name, similarity in identity_filter.rank(interest_scores, selected):
+        print(f"{similarity:.4f}  {club_name}")
+
+if __name__ == "__main__":
+    main()
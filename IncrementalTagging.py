@@ -0,0 +1,228 @@
+import csv
+import json
+import os
+
+import numpy as np
+
+from ScoreArtifact import write_artifact
+from SharedModels import embedding_namespace
+from TagVocabulary import TagVocabulary, diff_tags
+
+# pandas and sklearn are imported inside the functions that use them, so the tagging scripts
+# (which build their TaggingJob at import) stay cheap to import
+
+KEY_COLUMN = "tablescraper-selected-row href"
+STATE_DIR = "tagging_state"
+
+
+class TaggingJob:
+    """
+    One tagging script's stages, so the full and incremental runs share them:
+        club_texts(df) -> the text embedded for each club
+        similarity_scores(df, tags) -> raw clubs x tags similarity matrix (before MinMax scaling)
+        build_scored_df(df, scaled_similarity_matrix) -> the output DataFrame, thresholds applied
+    """
+
+    def __init__(self, name, model_name, scrape_csv, output_csv, tags, club_texts, similarity_scores, build_scored_df):
+        self.name = name
+        self.model_name = model_name
+        self.scrape_csv = scrape_csv
+        self.output_csv = output_csv
+        self.tags = list(tags)
+        self.club_texts = club_texts
+        self.similarity_scores = similarity_scores
+        self.build_scored_df = build_scored_df
+        self.state_path = os.path.join(STATE_DIR, name)
+
+
+class MinMaxStats:
+    """
+    Per-tag min/max of the raw similarity matrix, i.e. what MinMaxScaler is fit on. Kept
+    alongside the raw scores so a scrape delta can update it without re-encoding any club.
+    """
+
+    def __init__(self, col_min, col_max):
+        self.col_min = np.asarray(col_min)
+        self.col_max = np.asarray(col_max)
+
+    @classmethod
+    def from_matrix(cls, raw_similarity):
+        return cls(raw_similarity.min(axis=0), raw_similarity.max(axis=0))
+
+    def updated(self, raw_similarity, removed_rows, added_rows):
+        """
+        Stats after removed_rows left and added_rows joined; raw_similarity is the full new
+        matrix. Only tags whose old min or max was one of the removed rows are rescanned.
+        """
+        col_min, col_max = self.col_min.copy(), self.col_max.copy()
+        if len(added_rows):
+            col_min = np.minimum(col_min, added_rows.min(axis=0))
+            col_max = np.maximum(col_max, added_rows.max(axis=0))
+        if len(removed_rows):
+            stale = (removed_rows <= self.col_min).any(axis=0) | (removed_rows >= self.col_max).any(axis=0)
+            col_min[stale] = raw_similarity[:, stale].min(axis=0)
+            col_max[stale] = raw_similarity[:, stale].max(axis=0)
+        return MinMaxStats(col_min, col_max)
+
+    def __eq__(self, other):
+        return np.array_equal(self.col_min, other.col_min) and np.array_equal(self.col_max, other.col_max)
+
+    def scale(self, raw_similarity):
+        from sklearn import preprocessing
+
+        # Fitting on just the min and max rows gives the exact scaler a full fit_transform would use
+        scaler = preprocessing.MinMaxScaler().fit(np.vstack([self.col_min, self.col_max]))
+        return scaler.transform(raw_similarity)
+
+
+def write_outputs(job, scored_df):
+    """job.output_csv (the export everything reads today) plus its binary artifact (see ScoreArtifact)."""
+    scored_df.to_csv(job.output_csv, index=False)
+    write_artifact(scored_df, job.output_csv)
+
+
+def save_state(job, scrape_df, raw_similarity):
+    os.makedirs(job.state_path, exist_ok=True)
+    scrape_df.to_csv(os.path.join(job.state_path, "scrape.csv"), index=False)
+    np.save(os.path.join(job.state_path, "raw_similarity.npy"), raw_similarity)
+    save_state_meta(job)
+
+
+def save_state_meta(job):
+    """state.json and the tag vocabulary entry; scrape.csv and raw_similarity.npy must already be written."""
+    with open(os.path.join(job.state_path, "state.json"), "w", encoding="utf-8") as f:
+        json.dump({"tags": job.tags, "model": embedding_namespace(job.model_name), "output_csv": job.output_csv}, f, indent=2)
+    TagVocabulary().record_output(job.output_csv, job.tags, embedding_namespace(job.model_name))
+
+
+def load_state(job):
+    """
+    Returns (previous scrape, its raw similarity rows, the tags those columns are for) or None
+    when there's nothing to build on.
+    """
+    import pandas as pd
+
+    state_file = os.path.join(job.state_path, "state.json")
+    if not os.path.exists(state_file) or not os.path.exists(job.output_csv):
+        return None
+    with open(state_file, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("model") != embedding_namespace(job.model_name) or state["output_csv"] != job.output_csv:
+        return None
+    old_df = pd.read_csv(os.path.join(job.state_path, "scrape.csv"))
+    return old_df, np.load(os.path.join(job.state_path, "raw_similarity.npy")), state["tags"]
+
+
+def splice_tag_columns(job, scrape_df, raw_similarity, old_tags):
+    """
+    Rearranges raw_similarity (columns for old_tags) into job.tags' columns. Columns of tags
+    that are still there are reused as-is; only added or renamed tags get a similarity
+    column computed.
+    """
+    old_columns = {}
+    for position, tag in enumerate(old_tags):
+        old_columns.setdefault(tag, position)
+    new_tags = list(dict.fromkeys(tag for tag in job.tags if tag not in old_columns))
+
+    if new_tags:
+        new_raw = np.asarray(job.similarity_scores(scrape_df, new_tags))
+        new_columns = {tag: position for position, tag in enumerate(new_tags)}
+
+    spliced = np.empty((len(scrape_df), len(job.tags)), dtype=raw_similarity.dtype)
+    for position, tag in enumerate(job.tags):
+        if tag in old_columns:
+            spliced[:, position] = raw_similarity[:, old_columns[tag]]
+        else:
+            spliced[:, position] = new_raw[:, new_columns[tag]]
+    return spliced
+
+
+def diff_scrapes(old_df, new_df, key=KEY_COLUMN):
+    """Returns (added, changed, deleted) sets of keys; a club changed if any scraped field did."""
+    old_rows = old_df.set_index(key).fillna("").astype(str)
+    new_rows = new_df.set_index(key).fillna("").astype(str)
+    old_keys, new_keys = set(old_rows.index), set(new_rows.index)
+
+    common = [k for k in new_rows.index if k in old_keys]
+    columns = list(new_rows.columns)
+    differs = (old_rows.loc[common, columns].to_numpy() != new_rows.loc[common, columns].to_numpy()).any(axis=1)
+    changed = {k for k, row_differs in zip(common, differs) if row_differs}
+    return new_keys - old_keys, changed, old_keys - new_keys
+
+
+def run_full(job, new_df=None):
+    import pandas as pd
+
+    if new_df is None:
+        new_df = pd.read_csv(job.scrape_csv)
+    raw_similarity = np.asarray(job.similarity_scores(new_df, job.tags))
+    scored_df = job.build_scored_df(new_df, MinMaxStats.from_matrix(raw_similarity).scale(raw_similarity))
+    write_outputs(job, scored_df)
+    save_state(job, new_df, raw_similarity)
+    return scored_df
+
+
+def run_incremental(job):
+    """
+    Diffs job.scrape_csv against the scrape the last run saw (by KEY_COLUMN) and only embeds
+    and thresholds added or changed clubs, dropping deleted ones from job.output_csv. If the
+    delta moves a tag's min or max, every row is rescaled and re-thresholded from the stored
+    raw scores, still without encoding unchanged clubs. Falls back to run_full without state.
+
+    If job.tags changed since the last run, only the added or renamed tags' columns are
+    computed and spliced in next to the stored ones.
+    """
+    import pandas as pd
+
+    state = load_state(job)
+    if state is None:
+        print(f"No previous {job.name} run to build on, tagging every club")
+        return run_full(job)
+
+    old_df, old_raw, old_tags = state
+    tags_changed = old_tags != job.tags
+    if tags_changed:
+        added_tags, removed_tags = diff_tags(old_tags, job.tags)
+        print(f"{job.name}: tag set changed, {len(added_tags)} tags added and {len(removed_tags)} removed")
+        old_raw = splice_tag_columns(job, old_df, old_raw, old_tags)
+    new_df = pd.read_csv(job.scrape_csv)
+    added, changed, deleted = diff_scrapes(old_df, new_df)
+    print(f"{job.name}: {len(added)} added, {len(changed)} changed, {len(deleted)} deleted")
+
+    old_positions = {k: position for position, k in enumerate(old_df[KEY_COLUMN])}
+    new_keys = new_df[KEY_COLUMN].to_list()
+    dirty = np.array([k in added or k in changed for k in new_keys], dtype=bool)
+    dirty_rows = np.flatnonzero(dirty)
+    clean_old_positions = [old_positions[k] for k, is_dirty in zip(new_keys, dirty) if not is_dirty]
+
+    raw_similarity = np.empty((len(new_df), old_raw.shape[1]), dtype=old_raw.dtype)
+    raw_similarity[~dirty] = old_raw[clean_old_positions]
+    if len(dirty_rows):
+        raw_similarity[dirty_rows] = job.similarity_scores(new_df.iloc[dirty_rows].reset_index(drop=True), job.tags)
+
+    removed_positions = [old_positions[k] for k in deleted | changed]
+    old_stats = MinMaxStats.from_matrix(old_raw)
+    stats = old_stats.updated(raw_similarity, old_raw[removed_positions], raw_similarity[dirty_rows])
+
+    if stats == old_stats and not tags_changed:
+        # Unchanged clubs keep their rows from the previous output; only dirty rows are scored
+        old_output = pd.read_csv(job.output_csv, float_precision="round_trip")
+        with open(job.output_csv, newline="", encoding="utf-8") as f:
+            old_output.columns = next(csv.reader(f))  # read_csv renames repeated tags ("Music.1")
+        # Back to the scores' own dtype so patched files print floats exactly like a full run
+        for position, dtype in enumerate(old_output.dtypes):
+            if dtype.kind == "f":
+                old_output.isetitem(position, old_output.iloc[:, position].astype(old_raw.dtype))
+        pieces = [old_output.iloc[clean_old_positions].set_axis(np.flatnonzero(~dirty))]
+        if len(dirty_rows):
+            dirty_df = new_df.iloc[dirty_rows].reset_index(drop=True)
+            fresh = job.build_scored_df(dirty_df, stats.scale(raw_similarity[dirty_rows]))
+            pieces.append(fresh.set_axis(dirty_rows))
+        scored_df = pd.concat(pieces).sort_index()
+    else:
+        print(f"{job.name}: tag columns or their min/max moved, rescaling every club from stored scores")
+        scored_df = job.build_scored_df(new_df, stats.scale(raw_similarity))
+
+    write_outputs(job, scored_df)
+    save_state(job, new_df, raw_similarity)
+    return scored_df
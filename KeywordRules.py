@@ -0,0 +1,62 @@
+import re
+
+import numpy as np
+
+NO_HIT = np.iinfo(np.int64).max
+
+# Curly quotes from the scraped descriptions would otherwise split "women’s" from "women's"
+APOSTROPHES = str.maketrans({"’": "'", "‘": "'"})
+
+
+class KeywordMatcher:
+    """
+    Compiles every keyword of every rule into one regex and matches a whole corpus in a
+    single pass per description. Keywords match on word boundaries, so trailing punctuation
+    ("women," / "(greek)" / "sisters'") no longer hides a hit.
+
+    rules maps a rule name to its keywords, e.g. {"woman": {...}, "greek": {...}}. A keyword
+    may belong to several rules ("sorority" is both "woman" and "greek").
+    """
+
+    def __init__(self, rules):
+        self.rule_names = list(rules)
+        self.rule_numbers = {name: number for number, name in enumerate(self.rule_names)}
+        self.word_rules = {}
+        for number, name in enumerate(self.rule_names):
+            for word in rules[name]:
+                self.word_rules.setdefault(word.lower().translate(APOSTROPHES), []).append(number)
+
+        # Longest first so "women's" wins over "women" inside the alternation
+        words = sorted(self.word_rules, key=len, reverse=True)
+        self.pattern = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, words)) + r")(?!\w)")
+
+    def match(self, descriptions):
+        """
+        Returns a sparse (descriptions x rules) CSR matrix. A stored value k means the rule's
+        first keyword was the k-th keyword found in that description (1-based), so rules can
+        also be ordered by which one the description mentions first.
+        """
+        from scipy import sparse  # imported here so importing the threshold functions stays fast
+
+        rows, cols, order = [], [], []
+        descriptions = list(descriptions)
+        for row, description in enumerate(descriptions):
+            if not isinstance(description, str):
+                continue
+            seen = set()
+            text = description.lower().translate(APOSTROPHES)
+            for hit_number, found in enumerate(self.pattern.finditer(text), start=1):
+                for rule in self.word_rules[found.group()]:
+                    if rule not in seen:
+                        seen.add(rule)
+                        rows.append(row)
+                        cols.append(rule)
+                        order.append(hit_number)
+
+        return sparse.csr_matrix((np.array(order, dtype=np.int64), (rows, cols)),
+                                 shape=(len(descriptions), len(self.rule_names)))
+
+    def first_hits(self, hits, rule_name):
+        """Dense column of first-hit order for one rule, NO_HIT where the rule didn't fire."""
+        column = hits[:, self.rule_numbers[rule_name]].toarray().ravel()
+        return np.where(column > 0, column, NO_HIT)
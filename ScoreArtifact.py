@@ -0,0 +1,151 @@
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Binary twin of each tagging output CSV, e.g. for 44TagsWithIdentity.csv:
+#   44TagsWithIdentity.scores.npy  every numeric (tag) column as one C-order float32 clubs x tags matrix
+#   44TagsWithIdentity.clubs.json  header: score column names in order, plus the text columns
+#                                  (Club Name, links, Description, ...) as one list per club row
+# Loading memory-maps the matrix, so matching reads scores straight from the page cache.
+
+
+def artifact_paths(output_csv):
+    stem = os.path.splitext(output_csv)[0]
+    return stem + ".scores.npy", stem + ".clubs.json"
+
+
+class ArtifactWriter:
+    """
+    Writes an artifact chunk by chunk (for StreamingTagging); write_artifact is the one-chunk case.
+    The first chunk decides which columns are scores: every numeric one. Each chunk's text rows
+    are appended to the header file as they arrive, so only the header stays in memory.
+    """
+
+    def __init__(self, output_csv, rows):
+        self.scores_path, self.header_path = artifact_paths(output_csv)
+        self.rows = rows
+        self.scores = None
+        self.score_columns = None
+        self.metadata_columns = None
+        self.header_file = None
+        self.rows_written = 0
+
+    def write_chunk(self, start, scored_df):
+        if self.scores is None:
+            numeric = scored_df.dtypes.map(lambda dtype: dtype.kind in "fiub").to_numpy()
+            self.score_positions = np.flatnonzero(numeric)
+            self.metadata_positions = np.flatnonzero(~numeric)
+            self.score_columns = [str(column) for column in scored_df.columns[self.score_positions]]
+            self.metadata_columns = [str(column) for column in scored_df.columns[self.metadata_positions]]
+            self.scores = np.lib.format.open_memmap(self.scores_path + ".tmp", mode="w+", dtype=np.float32,
+                                                    shape=(self.rows, len(self.score_columns)))
+            # The header's fixed fields, then the "metadata" array is left open for the rows
+            header = json.dumps({"rows": self.rows, "dtype": "float32", "scores_file": os.path.basename(self.scores_path),
+                                 "score_columns": self.score_columns, "metadata_columns": self.metadata_columns})
+            self.header_file = open(self.header_path + ".tmp", "w", encoding="utf-8")
+            self.header_file.write(header[:-1] + ', "metadata": [')
+
+        self.scores[start:start + len(scored_df)] = scored_df.iloc[:, self.score_positions].to_numpy(dtype=np.float32)
+        # NaN (e.g. a club with no description) becomes null rather than invalid JSON
+        text = scored_df.iloc[:, self.metadata_positions].astype(object)
+        for row in text.where(text.notna(), None).itertuples(index=False, name=None):
+            self.header_file.write(("," if self.rows_written else "") + "\n" + json.dumps(list(row)))
+            self.rows_written += 1
+
+    def close(self):
+        self.scores.flush()
+        del self.scores
+        self.header_file.write("\n]}")
+        self.header_file.close()
+        os.replace(self.scores_path + ".tmp", self.scores_path)
+        os.replace(self.header_path + ".tmp", self.header_path)
+
+
+def read_output_csv(output_csv):
+    """A tagging output CSV as a DataFrame with its real header: read_csv alone renames repeated tags ("Music.1")."""
+    import csv
+    import pandas as pd
+
+    scored_df = pd.read_csv(output_csv)
+    with open(output_csv, newline="", encoding="utf-8") as f:
+        scored_df.columns = next(csv.reader(f))
+    return scored_df
+
+
+def write_artifact(scored_df, output_csv):
+    writer = ArtifactWriter(output_csv, len(scored_df))
+    writer.write_chunk(0, scored_df)
+    writer.close()
+
+
+class ScoreArtifact:
+    """
+    A tagging output loaded from its artifact. scores is a read-only memory map; columns()
+    picks tag columns by name, metadata holds the text columns as plain lists.
+    """
+
+    def __init__(self, output_csv):
+        scores_path, header_path = artifact_paths(output_csv)
+        with open(header_path, encoding="utf-8") as f:
+            header = json.load(f)
+        self.score_columns = header["score_columns"]
+        if isinstance(header["metadata"], dict):
+            # Written before the rows were streamed: already one list per column
+            self.metadata = header["metadata"]
+        else:
+            # Stored one list per club; kept here as one list per column
+            columns = zip(*header["metadata"]) if header["metadata"] else [[] for _ in header["metadata_columns"]]
+            self.metadata = {column: list(values) for column, values in zip(header["metadata_columns"], columns)}
+        self.scores = np.load(scores_path, mmap_mode="r")
+        # A repeated tag name ("Music" is both an interest and a major) resolves to its first column
+        self.column_positions = {}
+        for position, column in enumerate(self.score_columns):
+            self.column_positions.setdefault(column, position)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def columns(self, names):
+        """rows x len(names) scores; a copy only if the columns aren't already the full matrix in order."""
+        positions = [self.column_positions[name] for name in names]
+        if positions == list(range(len(self.score_columns))):
+            return self.scores
+        return self.scores[:, positions]
+
+    def to_dataframe(self):
+        """The scores and text columns as one DataFrame (score columns first), for CSV-era callers."""
+        import pandas as pd
+
+        df = pd.DataFrame(np.asarray(self.scores), columns=self.score_columns)
+        for column, values in self.metadata.items():
+            df[column] = values
+        return df
+
+
+def main():
+    # python ScoreArtifact.py 44TagsWithIdentity.csv writes the artifact for an existing output CSV
+    # and compares its size and load time with the CSV's
+    output_csv = sys.argv[1] if len(sys.argv) > 1 else "44TagsWithIdentity.csv"
+    start = time.perf_counter()
+    scored_df = read_output_csv(output_csv)
+    csv_seconds = time.perf_counter() - start
+    write_artifact(scored_df, output_csv)
+
+    start = time.perf_counter()
+    artifact = ScoreArtifact(output_csv)
+    scores_sum = float(artifact.scores.sum())  # touch every page so the timing isn't just the mmap call
+    artifact_seconds = time.perf_counter() - start
+
+    scores_path, header_path = artifact_paths(output_csv)
+    csv_bytes = os.path.getsize(output_csv)
+    scores_bytes, header_bytes = os.path.getsize(scores_path), os.path.getsize(header_path)
+    print(f"{output_csv}: {csv_bytes:,} bytes, parsed in {csv_seconds * 1000:.1f} ms")
+    print(f"artifact: {scores_bytes:,} bytes of scores + {header_bytes:,} bytes of header/text "
+          f"({(scores_bytes + header_bytes) / csv_bytes:.0%} of the CSV, scores alone {scores_bytes / csv_bytes:.0%}), "
+          f"loaded in {artifact_seconds * 1000:.1f} ms (checksum {scores_sum:.3f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+from contextlib import contextmanager
+from functools import lru_cache
+
+from EmbeddingCache import EmbeddingStore
+
+# torch, sentence_transformers and pandas are only imported on first use, so importing the
+# tagging scripts (e.g. just for their threshold functions) doesn't load any of them.
+# Each accessor is cached: one instance per model name / CSV per process, so scripts that
+# share a model (and the unified pipeline running them together) load it only once.
+
+# Which Encoders backend load_model uses; pick one with --backend on any tagging entry point
+_backend = "torch"
+# Worker processes for encode_texts; 0 encodes in this process. Set with --workers N
+_encode_workers = 0
+# (model name, backend) -> EncoderPool kept open by encoder_pools(); None outside of it
+_encoder_pools = None
+
+
+def set_backend(backend):
+    from Encoders import BACKENDS
+
+    global _backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    _backend = backend
+
+
+def set_backend_from_argv(argv):
+    if "--backend" in argv:
+        set_backend(argv[argv.index("--backend") + 1])
+
+
+def set_encode_workers_from_argv(argv):
+    global _encode_workers
+    if "--workers" in argv:
+        _encode_workers = int(argv[argv.index("--workers") + 1])
+
+
+def embedding_namespace(model_name):
+    """Cache/state key for model_name's embeddings; quantized or ONNX embeddings are kept apart from fp32."""
+    return model_name if _backend == "torch" else f"{model_name}@{_backend}"
+
+
+def get_device():
+    if _backend != "torch":
+        return "cpu"  # the int8 and ONNX backends are CPU-only
+    return _torch_device()
+
+
+@lru_cache(maxsize=None)
+def _torch_device():
+    import torch
+
+    return "mps" if torch.backends.mps.is_available() else "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def load_model(model_name):
+    return _load_model(model_name, _backend)
+
+
+@lru_cache(maxsize=None)
+def _load_model(model_name, backend):
+    from Encoders import load_encoder
+
+    return load_encoder(model_name, backend)
+
+
+def get_embedding_store(model_name):
+    return _get_embedding_store(embedding_namespace(model_name))
+
+
+@lru_cache(maxsize=None)
+def _get_embedding_store(namespace):
+    store = EmbeddingStore(namespace)
+    _embedding_stores.append(store)
+    return store
+
+
+# Every store opened in this process, for print_cache_reports
+_embedding_stores = []
+
+
+def print_cache_reports():
+    """Where each store's embeddings came from (memory, disk, or model.encode) in this process."""
+    for store in _embedding_stores:
+        print(store.report())
+
+
+@contextmanager
+def encoder_pools():
+    """
+    With --workers, keeps each model's worker pool open until the block ends, so repeated
+    encode_texts calls (one per streamed chunk) reuse workers that load the model once.
+    Outside of it every encode_texts call starts and stops its own pool.
+    """
+    global _encoder_pools
+    if _encoder_pools is not None:
+        yield
+        return
+    _encoder_pools = {}
+    try:
+        yield
+    finally:
+        for pool in _encoder_pools.values():
+            pool.close()
+        _encoder_pools = None
+
+
+def _encoder_pool(model_name):
+    from Encoders import EncoderPool
+
+    if _encoder_pools is None:
+        return None
+    if (model_name, _backend) not in _encoder_pools:
+        _encoder_pools[(model_name, _backend)] = EncoderPool(model_name, _backend, _encode_workers)
+    return _encoder_pools[(model_name, _backend)]
+
+
+def encode_texts(model_name, texts, **encode_kwargs):
+    """
+    Embeddings of texts from model_name's store, encoding the missing ones in this process
+    or, with --workers, in a multi-process pool (for corpora far bigger than one campus).
+    """
+    store = get_embedding_store(model_name)
+    if _encode_workers:
+        return store.encode_with_pool(model_name, texts, _backend, _encode_workers, pool=_encoder_pool(model_name),
+                                      **encode_kwargs)
+    return store.encode(load_model(model_name), texts, **encode_kwargs)
+
+
+@lru_cache(maxsize=None)
+def load_scrape(scrape_csv):
+    """The scraped clubs CSV, read once per process. Callers must not modify the returned frame."""
+    import pandas as pd
+
+    return pd.read_csv(scrape_csv)
@@ -0,0 +1,109 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from IncrementalTagging import MinMaxStats, save_state_meta
+from ScoreArtifact import ArtifactWriter
+from SharedModels import encoder_pools, set_backend_from_argv, set_encode_workers_from_argv
+
+# Rows per chunk in both passes. Peak memory is a few chunks of clubs x tags, not the corpus
+CHUNK_ROWS = 4096
+
+
+def read_scrape_chunks(scrape_csv, chunk_rows=CHUNK_ROWS):
+    """The scrape in chunk_rows-row DataFrames, each indexed from 0 like a full read_csv."""
+    import pandas as pd
+
+    for chunk in pd.read_csv(scrape_csv, chunksize=chunk_rows):
+        yield chunk.reset_index(drop=True)
+
+
+def stream_raw_similarity(job, raw_path, chunk_rows=CHUNK_ROWS):
+    """
+    Pass 1: scores the scrape chunk by chunk into a float32 .npy memory map at raw_path and
+    returns the per-tag min/max. Only one chunk of scores is in memory at a time.
+    """
+    import pandas as pd
+
+    rows = sum(len(chunk) for chunk in pd.read_csv(job.scrape_csv, chunksize=chunk_rows, usecols=[0]))
+    raw = np.lib.format.open_memmap(raw_path, mode="w+", dtype=np.float32, shape=(rows, len(job.tags)))
+    col_min = np.full(len(job.tags), np.inf, dtype=np.float32)
+    col_max = np.full(len(job.tags), -np.inf, dtype=np.float32)
+
+    start = 0
+    for chunk in read_scrape_chunks(job.scrape_csv, chunk_rows):
+        scores = np.asarray(job.similarity_scores(chunk, job.tags), dtype=np.float32)
+        raw[start:start + len(chunk)] = scores
+        np.minimum(col_min, scores.min(axis=0), out=col_min)
+        np.maximum(col_max, scores.max(axis=0), out=col_max)
+        start += len(chunk)
+    raw.flush()
+    del raw
+    return MinMaxStats(col_min, col_max)
+
+
+def write_scored_chunks(job, raw_path, stats, chunk_rows=CHUNK_ROWS):
+    """
+    Pass 2: scales and thresholds each chunk of stored scores and appends it to job.output_csv
+    and its binary artifact. Both are written under temporary names and only replace the
+    previous output once every chunk is in.
+    """
+    raw = np.load(raw_path, mmap_mode="r")
+    artifact = ArtifactWriter(job.output_csv, len(raw))
+    csv_tmp = job.output_csv + ".tmp"
+    start = 0
+    for number, chunk in enumerate(read_scrape_chunks(job.scrape_csv, chunk_rows)):
+        scored_chunk = job.build_scored_df(chunk, stats.scale(raw[start:start + len(chunk)]))
+        scored_chunk.to_csv(csv_tmp, index=False, mode="w" if number == 0 else "a", header=number == 0)
+        artifact.write_chunk(start, scored_chunk)
+        start += len(chunk)
+    del raw
+    artifact.close()
+    os.replace(csv_tmp, job.output_csv)
+    return start
+
+
+def run_streaming(job, chunk_rows=CHUNK_ROWS):
+    """
+    Same output as run_full, but for corpora too big to hold a clubs x tags matrix (plus its
+    scaled and DataFrame copies) in memory. The raw scores go straight to the job's
+    incremental state, so a later run_incremental builds on a streamed run as usual.
+
+    state.json is removed first and rewritten last, and the raw scores and scrape copy are
+    written under temporary names, so an interrupted run leaves no state for run_incremental
+    to trust: the next incremental run falls back to a full one.
+    """
+    os.makedirs(job.state_path, exist_ok=True)
+    state_file = os.path.join(job.state_path, "state.json")
+    if os.path.exists(state_file):
+        os.remove(state_file)
+
+    raw_tmp = os.path.join(job.state_path, "raw_similarity.tmp.npy")
+    with encoder_pools():  # with --workers, one pool for every chunk rather than one per chunk
+        stats = stream_raw_similarity(job, raw_tmp, chunk_rows)
+    rows = write_scored_chunks(job, raw_tmp, stats, chunk_rows)
+    scrape_tmp = os.path.join(job.state_path, "scrape.csv.tmp")
+    shutil.copyfile(job.scrape_csv, scrape_tmp)
+    os.replace(raw_tmp, os.path.join(job.state_path, "raw_similarity.npy"))
+    os.replace(scrape_tmp, os.path.join(job.state_path, "scrape.csv"))
+    save_state_meta(job)
+    print(f"Wrote {rows} clubs to {job.output_csv} in chunks of {chunk_rows}")
+
+
+def main():
+    # python StreamingTagging.py [AllTagging] [--chunk-rows 4096] [--backend onnx-int8] [--workers 8]
+    from TaggingPipeline import JOBS
+
+    set_backend_from_argv(sys.argv)
+    set_encode_workers_from_argv(sys.argv)
+    chunk_rows = int(sys.argv[sys.argv.index("--chunk-rows") + 1]) if "--chunk-rows" in sys.argv else CHUNK_ROWS
+    names = [job.name for job in JOBS]
+    selected = [arg for arg in sys.argv[1:] if arg in names] or ["AllTagging"]
+    for job in JOBS:
+        if job.name in selected:
+            run_streaming(job, chunk_rows)
+
+if __name__ == "__main__":
+    main()
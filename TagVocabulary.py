@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+REGISTRY_FILE = "tag_vocabulary.json"
+
+
+def tag_set_version(tags):
+    """Short, stable id of an ordered tag list (the column order matters to the output CSVs)."""
+    return hashlib.sha1("\n".join(tags).encode("utf-8")).hexdigest()[:12]
+
+
+class TagVocabulary:
+    """
+    Registry of every tag set the tagging scripts have used and which one (and which model)
+    produced each output CSV, e.g.
+        {"tag_sets": {"3f1c...": {"tags": [...], "first_used": "..."}},
+         "outputs": {"44TagsWithIdentity.csv": {"tag_set": "3f1c...", "model": "...", "written": "..."}}}
+    The label embeddings themselves live in the per-model EmbeddingStore.
+    """
+
+    def __init__(self, path=REGISTRY_FILE):
+        self.path = path
+        self.tag_sets = {}
+        self.outputs = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                registry = json.load(f)
+            self.tag_sets = registry["tag_sets"]
+            self.outputs = registry["outputs"]
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"tag_sets": self.tag_sets, "outputs": self.outputs}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def register(self, tags):
+        version = tag_set_version(tags)
+        if version not in self.tag_sets:
+            self.tag_sets[version] = {"tags": list(tags), "first_used": datetime.now().isoformat(timespec="seconds")}
+        return version
+
+    def record_output(self, output_csv, tags, model_name):
+        version = self.register(tags)
+        self.outputs[output_csv] = {"tag_set": version, "model": model_name,
+                                    "written": datetime.now().isoformat(timespec="seconds")}
+        self.save()
+        return version
+
+    def output_tags(self, output_csv):
+        """Tag list that produced output_csv, or None if it was never recorded."""
+        if output_csv not in self.outputs:
+            return None
+        return self.tag_sets[self.outputs[output_csv]["tag_set"]]["tags"]
+
+
+def diff_tags(old_tags, new_tags):
+    """Returns (added, removed) labels; a rename shows up as one of each."""
+    return [tag for tag in new_tags if tag not in old_tags], [tag for tag in old_tags if tag not in new_tags]
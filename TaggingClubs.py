@@ -1,19 +1,15 @@
-from sentence_transformers import SentenceTransformer
-import pandas as pd
-import torch
-from sklearn import preprocessing
+import sys
+from functools import lru_cache
 
-DEVICE = "mps" if torch.backends.mps.is_available() else "cpu"
+import numpy as np
+from IncrementalTagging import MinMaxStats, TaggingJob, run_full, run_incremental
+from SharedModels import get_device, load_model, get_embedding_store, load_scrape, set_backend_from_argv, print_cache_reports
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+MODEL_NAME = "all-MiniLM-L6-v2"
+# The model and scrape are only loaded by main / get_sim_df, not when this module is imported
 
-df = pd.read_csv("NicosScrapedData.csv")
-#Get a vector of the Club Names from the scraped data
-club_name = df["Club Name"]
-#get a list of the Descriptions of the club
-descriptions = df["Description Excerpt"].to_list()
-#Get the links to the website from scraped data
-links = df["tablescraper-selected-row href"]
+SCRAPE_CSV = "NicosScrapedData.csv"
+OUTPUT_CSV = "26MarchScored.csv"
 
 all_tags = [
     "Volunteering",
@@ -58,16 +54,53 @@ all_tags = [
     "Culinary Arts"
 ]
 
-descriptions_embeddings = model.encode(descriptions, show_progress_bar=True, device=DEVICE)
-tags_embedding = model.encode(all_tags, show_progress_bar=True, device=DEVICE)
 
-similarity_matrix = model.similarity(descriptions_embeddings, tags_embedding)
+def club_texts(df):
+    #get a list of the Descriptions of the club
+    return df["Description Excerpt"].to_list()
 
-min_max_scaler = preprocessing.MinMaxScaler()
-scaled_similarity_matrix = min_max_scaler.fit_transform(similarity_matrix)
 
-sim_df = pd.DataFrame(scaled_similarity_matrix, columns= all_tags)
-sim_df['Club Name'] = club_name
-sim_df["Link"] = links
+def similarity_scores(df, tags=all_tags):
+    """Raw cosine similarities, rows are descriptions, columns are tags."""
+    model = load_model(MODEL_NAME)
+    embedding_store = get_embedding_store(MODEL_NAME)
+    descriptions_embeddings = embedding_store.encode(model, club_texts(df), show_progress_bar=True, device=get_device())
+    # Each label is embedded once per model and then read back from the store
+    tags_embedding = embedding_store.encode(model, tags, show_progress_bar=True, device=get_device())
+    return np.asarray(model.similarity(descriptions_embeddings, tags_embedding))
 
-sim_df.to_csv('26MarchScored.csv', index=False)
+
+def build_scored_df(df, scaled_similarity_matrix):
+    import pandas as pd
+
+    sim_df = pd.DataFrame(scaled_similarity_matrix, columns= all_tags)
+    #Get a vector of the Club Names from the scraped data
+    sim_df['Club Name'] = df["Club Name"]
+    #Get the links to the website from scraped data
+    sim_df["Link"] = df["tablescraper-selected-row href"]
+    return sim_df
+
+
+TAGGING_JOB = TaggingJob("TaggingClubs", MODEL_NAME, SCRAPE_CSV, OUTPUT_CSV, all_tags, club_texts, similarity_scores, build_scored_df)
+
+
+@lru_cache(maxsize=None)
+def get_sim_df():
+    """Scored clubs for SCRAPE_CSV, built on first call (model load + encoding) without writing OUTPUT_CSV."""
+    df = load_scrape(SCRAPE_CSV)
+    similarity_matrix = similarity_scores(df)
+    return build_scored_df(df, MinMaxStats.from_matrix(similarity_matrix).scale(similarity_matrix))
+
+
+def main():
+    # python TaggingClubs.py --incremental only re-tags clubs that changed since the last run,
+    # --backend torch-int8/onnx/onnx-int8 swaps the fp32 PyTorch encoder (see Encoders.py)
+    set_backend_from_argv(sys.argv)
+    if "--incremental" in sys.argv:
+        run_incremental(TAGGING_JOB)
+    else:
+        run_full(TAGGING_JOB)
+    print_cache_reports()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import sys
+
+import AllTagging
+import TaggingClubIdentity
+import TaggingClubs
+from IncrementalTagging import run_full, run_incremental
+from SharedModels import get_device, encode_texts, load_scrape, set_backend_from_argv, set_encode_workers_from_argv, print_cache_reports
+from Thresholds import band_scores
+from WebPayload import write_payload
+
+JOBS = [AllTagging.TAGGING_JOB, TaggingClubIdentity.TAGGING_JOB, TaggingClubs.TAGGING_JOB]
+
+# The production tag file the quizlinking notebook used to make from TaggingClubs' scores
+BANDED_CSV = "FinalWinterClubsWithTags.csv"
+
+
+def encode_shared_texts(jobs):
+    """
+    Encodes every distinct description and tag label once per model, in a single encode
+    call per model. The jobs' own similarity_scores calls then read from the embedding store.
+    """
+    scrapes = {}
+    by_model = {}
+    for job in jobs:
+        if job.scrape_csv not in scrapes:
+            scrapes[job.scrape_csv] = load_scrape(job.scrape_csv)
+        by_model.setdefault(job.model_name, []).append(job)
+
+    for model_name, model_jobs in by_model.items():
+        texts = {}
+        for job in model_jobs:
+            texts.update(dict.fromkeys(job.club_texts(scrapes[job.scrape_csv])))
+            texts.update(dict.fromkeys(job.tags))
+        print(f"{model_name}: {len(texts)} distinct texts for {', '.join(job.name for job in model_jobs)}")
+        encode_texts(model_name, list(texts), show_progress_bar=True, device=get_device())
+    return scrapes
+
+
+def write_banded_tags(job=TaggingClubs.TAGGING_JOB, banded_csv=BANDED_CSV):
+    """job's tag scores banded and top-3 promoted (see Thresholds.band_scores), then Club Name."""
+    import pandas as pd
+    from ScoreArtifact import ScoreArtifact
+
+    artifact = ScoreArtifact(job.output_csv)
+    banded_df = pd.DataFrame(band_scores(artifact.scores), columns=artifact.score_columns)
+    banded_df["Club Name"] = artifact.metadata["Club Name"]
+    banded_df.to_csv(banded_csv, index=False)
+    print(f"Wrote {banded_csv}")
+
+
+def run_pipeline(jobs=JOBS, incremental=False):
+    scrapes = encode_shared_texts(jobs)
+    for job in jobs:
+        if incremental:
+            run_incremental(job)
+        else:
+            run_full(job, scrapes[job.scrape_csv])
+        print(f"Wrote {job.output_csv}")
+        if job is AllTagging.TAGGING_JOB:
+            # The app's data: republished from the fresh artifact on every run
+            _, payload_path, lazy_path = write_payload(job.output_csv)
+            print(f"Wrote {payload_path} and {lazy_path}")
+    if TaggingClubs.TAGGING_JOB in jobs:
+        write_banded_tags()
+
+
+def main():
+    # python TaggingPipeline.py [--incremental] [--backend onnx-int8] [--workers 8] writes every
+    # tagging script's output in one process
+    set_backend_from_argv(sys.argv)
+    set_encode_workers_from_argv(sys.argv)
+    run_pipeline(incremental="--incremental" in sys.argv)
+    print_cache_reports()
+    print(f"Device is {get_device()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import numpy as np
+
+from KeywordRules import KeywordMatcher, NO_HIT
+
+# Keyword sets used to override the embedding scores when a club says outright who it's for
+WOMEN_WORDS = frozenset({"woman", "woman's", "women", "women's", "womens", "sisterhood", "sister", "sisters", "sorority"})
+MEN_WORDS = frozenset({"man", "man's", "men", "men's", "mens", "brotherhood", "brother", "brothers"})
+GREEK_LIFE_WORDS = frozenset({"greek", "fraternity", "sorority", "brotherhood", "sisterhood", "brothers", "sisters",
+                              "alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa",
+                              "lambda", "mu", "nu", "xi", "omicron", "pi", "rho", "sigma", "tau", "upsilon",
+                              "phi", "chi", "psi", "omega"})
+
+# Every keyword rule goes through one matcher, so adding e.g. a religion rule here costs no extra
+# passes over the descriptions
+IDENTITY_KEYWORDS = KeywordMatcher({
+    "woman": WOMEN_WORDS,
+    "man": MEN_WORDS,
+    "greek": GREEK_LIFE_WORDS,
+})
+
+
+def identity_keyword_hits(dataframe):
+    """Matches every identity keyword rule against the Description column in one pass."""
+    return IDENTITY_KEYWORDS.match(dataframe["Description"])
+
+
+def race_threshold(thresh_value, race_list, dataframe):
+    # The largest race value is set to 1.0 as long as it's above thresh_value. If every value is
+    # above it, or none is, they are all set to 1.0.
+    scores = dataframe[race_list].to_numpy(dtype=np.float64)
+    above = scores >= thresh_value
+    only_max = above.any(axis=1) & ~above.all(axis=1)
+
+    result = np.ones_like(scores)
+    result[only_max] = 0.0
+    result[np.flatnonzero(only_max), scores[only_max].argmax(axis=1)] = 1.0
+    dataframe[race_list] = result
+
+
+def gender_threshold(dataframe, thresh_value, hits=None):
+    # If the name/desc contains the gender in it, the first gendered word wins. Otherwise, if both
+    # scores are above or below thresh_value, set them both to 1.0, else set only the larger one.
+    if hits is None:
+        hits = identity_keyword_hits(dataframe)
+    woman_hit = IDENTITY_KEYWORDS.first_hits(hits, "woman")
+    man_hit = IDENTITY_KEYWORDS.first_hits(hits, "man")
+    found_woman = (woman_hit != NO_HIT) & (woman_hit <= man_hit)
+    found_man = (man_hit != NO_HIT) & (man_hit < woman_hit)
+
+    woman_score = dataframe["woman women"].to_numpy(dtype=np.float64)
+    man_score = dataframe["man men"].to_numpy(dtype=np.float64)
+    both = (woman_score >= thresh_value) == (man_score >= thresh_value)
+    woman_larger = woman_score > man_score
+
+    woman = np.where(found_woman | (~found_man & (both | woman_larger)), 1.0, 0.0)
+    man = np.where(found_man | (~found_woman & (both | ~woman_larger)), 1.0, 0.0)
+    dataframe["woman women"] = woman
+    dataframe["man men"] = man
+
+
+def greek_life_threshold(dataframe, hits=None):
+    # If the name/desc contains greek life in it, set it to 1.0. Otherwise, set it to 0.0.
+    if hits is None:
+        hits = identity_keyword_hits(dataframe)
+    dataframe["Greek"] = np.where(IDENTITY_KEYWORDS.first_hits(hits, "greek") != NO_HIT, 1.0, 0.0)
+
+
+def lgbtq_threshold(dataframe, thresh_value):
+    # If the lgbtq score is above thresh_value, set it to 1.0. Otherwise, set it to 0.0.
+    dataframe["lgbtq"] = np.where(dataframe["lgbtq"].to_numpy(dtype=np.float64) >= thresh_value, 1.0, 0.0)
+
+
+def band_scores(scores, thresh_low=0.4, thresh_high=0.7, top_n=3):
+    """
+    Banded tags from the quizlinking notebook, for a whole clubs x tags matrix at once:
+    scores <= thresh_low become 0, up to thresh_high 0.5, above it 1. Then each club's top_n
+    tags by raw score (ties go to the earlier column, like nlargest) are promoted: a 1 becomes
+    2, anything else becomes 1.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    banded = np.where(scores <= thresh_low, 0.0, np.where(scores <= thresh_high, 0.5, 1.0))
+    top_n = min(top_n, scores.shape[1])
+    if top_n == 0 or len(scores) == 0:
+        return banded
+
+    top = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    # argpartition picks arbitrarily among scores tied with the top_n-th; those rows take a
+    # stable sort instead so the earlier column wins
+    nth_best = np.take_along_axis(scores, top, axis=1).min(axis=1, keepdims=True)
+    tied = np.flatnonzero((scores >= nth_best).sum(axis=1) > top_n)
+    if len(tied):
+        top[tied] = np.argsort(-scores[tied], axis=1, kind="stable")[:, :top_n]
+
+    promoted = np.take_along_axis(banded, top, axis=1)
+    np.put_along_axis(banded, top, np.where(promoted == 1.0, 2.0, 1.0), axis=1)
+    return banded
+
+
+def band_threshold(dataframe, tag_columns, thresh_low=0.4, thresh_high=0.7, top_n=3):
+    # Replaces the tag_columns of dataframe with their bands (see band_scores)
+    dataframe[tag_columns] = band_scores(dataframe[tag_columns].to_numpy(dtype=np.float64), thresh_low, thresh_high, top_n)
@@ -1,4 +1,8 @@
-import csv
+import math
+
+import numpy as np
+
+from ClubLoader import load_tag_table
 
 # ------------------------------------------------
 # 1. DEFINE TAGS AND BROAD CATEGORIES
@@ -85,29 +89,9 @@ def load_clubs_from_csv(csv_filename):
         column 3 (Tag IDs (comma- or semicolon-separated), e.g. 3;20;8)
     Returns a list of club dicts:
         [{"name": str, "description": str, "tags": [list of ints]}, ...]
+    Parsed once by ClubLoader; later loads read its binary sidecar until the CSV changes.
     """
-    clubs = []
-    with open(csv_filename, mode='r', encoding='utf-8-sig') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if not row:
-                continue
-            club_name = row[0].strip()
-            description = row[1].strip()
-            tag_str = row[2].strip()
-
-            # Split by semicolon or comma
-            if ";" in tag_str:
-                tag_list = [int(x) for x in tag_str.split(";") if x.strip().isdigit()]
-            else:
-                tag_list = [int(x) for x in tag_str.split(",") if x.strip().isdigit()]
-
-            clubs.append({
-                "name": club_name,
-                "description": description,
-                "tags": tag_list
-            })
-    return clubs
+    return load_tag_table(csv_filename).to_dicts()
 
 
 # ------------------------------------------------
@@ -149,22 +133,99 @@ def collect_user_tags():
 # 4. MATCHING & RANKING
 # ------------------------------------------------
 
-def get_match_score(yes_tags, club_tags):
+class TagIndex:
+    """
+    Inverted index from tag id to the sorted ids (positions in the clubs list) of the clubs
+    that have that tag. Built once from load_clubs_from_csv, so a query only touches the
+    postings of the user's yes-tags instead of every club.
+    """
+
+    def __init__(self, clubs):
+        self.num_clubs = len(clubs)
+        postings = {}
+        for club_id, club in enumerate(clubs):
+            for tid in set(club["tags"]):
+                postings.setdefault(tid, []).append(club_id)
+        self.postings = {tid: np.array(club_ids, dtype=np.int64) for tid, club_ids in postings.items()}
+
+    def match_counts(self, yes_tags, min_matches=1):
+        """
+        Returns (club_ids, counts) for every club sharing at least min_matches of yes_tags,
+        club ids ascending.
+
+        A club with min_matches hits across L posting lists must appear in at least one of
+        any L - min_matches + 1 of them, so candidates only come from the shortest ones.
+        """
+        lists = sorted((self.postings[tid] for tid in set(yes_tags) if tid in self.postings), key=len)
+        min_matches = max(min_matches, 1)
+        if min_matches > len(lists):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        candidates = np.unique(np.concatenate(lists[:len(lists) - min_matches + 1]))
+        counts = np.zeros(len(candidates), dtype=np.int64)
+        for club_ids in lists:
+            counts += np.isin(candidates, club_ids, assume_unique=True)
+        keep = counts >= min_matches
+        return candidates[keep], counts[keep]
+
+    def overlap_counts(self, club_ids, tag_ids):
+        """How many of tag_ids each of club_ids has."""
+        counts = np.zeros(len(club_ids), dtype=np.int64)
+        for tid in set(tag_ids):
+            if tid in self.postings:
+                counts += np.isin(club_ids, self.postings[tid])
+        return counts
+
+
+def popcount(values):
+    """Number of set bits in each uint64."""
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(values).astype(np.int64)
+    values = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    values = (values & np.uint64(0x3333333333333333)) + ((values >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    values = (values + (values >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((values * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+
+
+def tags_to_bits(tag_ids):
+    bits = 0
+    for tid in tag_ids:
+        if not 0 <= tid < 64:
+            raise ValueError(f"Tag id {tid} doesn't fit in a 64-bit club mask")
+        bits |= 1 << tid
+    return np.uint64(bits)
+
+
+class ClubBitsets:
     """
-    Returns the number of matched tags between user's yes_tags and the club's tags.
+    Every club's tags packed into one uint64 (bit t set when the club has tag t, so ALL_TAGS'
+    ids 1-40 fit easily). Overlap with a user's yes/no tags is popcount(club & user) over the
+    whole array at once. Same match_counts/overlap_counts interface as TagIndex.
     """
-    intersection = set(club_tags).intersection(yes_tags)
-    return len(intersection)
 
+    def __init__(self, clubs):
+        self.num_clubs = len(clubs)
+        self.masks = np.array([tags_to_bits(club["tags"]) for club in clubs], dtype=np.uint64)
 
-def filter_and_rank_clubs(clubs, yes_tags, partial_threshold=0.5):
+    def match_counts(self, yes_tags, min_matches=1):
+        counts = popcount(self.masks & tags_to_bits(set(yes_tags)))
+        club_ids = np.flatnonzero(counts >= max(min_matches, 1))
+        return club_ids, counts[club_ids]
+
+    def overlap_counts(self, club_ids, tag_ids):
+        return popcount(self.masks[club_ids] & tags_to_bits(set(tag_ids)))
+
+
+def filter_and_rank_clubs(clubs, yes_tags, partial_threshold=0.5, tag_index=None, no_tags=(), no_penalty=0.0):
     """
     1) Filter out clubs that don't meet the 'partial_threshold' of matching.
        partial_threshold is a fraction of the user's yes_tags that must match.
          e.g., 0.5 means at least 50% of the user's yes-tags must appear in the club.
-    2) Rank (sort) clubs by how many tags match (descending).
+    2) Rank (sort) clubs by how many tags match minus no_penalty for every one of the
+       user's no_tags the club has (descending), ties in CSV order.
 
-    Returns a sorted list of clubs that meet or exceed the threshold.
+    Pass a TagIndex or ClubBitsets built once from the same clubs list to avoid rebuilding
+    it per query. Returns a sorted list of clubs that meet or exceed the threshold.
     """
     user_yes_count = len(yes_tags)
     if user_yes_count == 0:
@@ -173,27 +234,41 @@ def filter_and_rank_clubs(clubs, yes_tags, partial_threshold=0.5):
         # Adjust as needed.
         return clubs
 
-    qualified_clubs = []
-    for club in clubs:
-        score = get_match_score(yes_tags, club["tags"])
-
-        # Calculate fraction of yes_tags matched
-        match_fraction = score / user_yes_count if user_yes_count > 0 else 0
+    if tag_index is None:
+        all_tag_ids = set(tid for club in clubs for tid in club["tags"]) | set(yes_tags) | set(no_tags)
+        tag_index = ClubBitsets(clubs) if all(0 <= tid < 64 for tid in all_tag_ids) else TagIndex(clubs)
+
+    # Fewest matches that can reach the threshold; clubs below it are never counted
+    min_matches = max(math.ceil(partial_threshold * user_yes_count), 0)
+    while min_matches > 0 and (min_matches - 1) / user_yes_count >= partial_threshold:
+        min_matches -= 1
+    while min_matches <= user_yes_count and min_matches / user_yes_count < partial_threshold:
+        min_matches += 1
+
+    if min_matches == 0:
+        # A threshold of 0 lets in clubs with no matching tags at all
+        club_ids = np.arange(tag_index.num_clubs)
+        scores = np.zeros(tag_index.num_clubs, dtype=np.int64)
+        matched_ids, matched_counts = tag_index.match_counts(yes_tags)
+        scores[matched_ids] = matched_counts
+    else:
+        club_ids, scores = tag_index.match_counts(yes_tags, min_matches)
 
-        # Check if it meets partial threshold
-        if match_fraction >= partial_threshold:
-            # Store the score so we can sort later
-            club_with_score = {
-                "name": club["name"],
-                "description": club["description"],
-                "tags": club["tags"],
-                "score": score
-            }
-            qualified_clubs.append(club_with_score)
+    rank_scores = scores.astype(np.float64)
+    if no_tags and no_penalty:
+        rank_scores -= no_penalty * tag_index.overlap_counts(club_ids, no_tags)
 
-    # Sort by score descending
-    qualified_clubs.sort(key=lambda c: c["score"], reverse=True)
-    return qualified_clubs
+    # Sort by score descending, then by position in the CSV
+    order = np.lexsort((club_ids, -rank_scores))
+    return [
+        {
+            "name": clubs[club_id]["name"],
+            "description": clubs[club_id]["description"],
+            "tags": clubs[club_id]["tags"],
+            "score": int(score)
+        }
+        for club_id, score in zip(club_ids[order], scores[order])
+    ]
 
 
 # ------------------------------------------------
@@ -217,11 +292,14 @@ def main():
     # 2. Load clubs from CSV
     csv_filename = "clubs.csv"  # Adjust the path as needed
     clubs = load_clubs_from_csv(csv_filename)
+    tag_index = ClubBitsets(clubs)
 
     # 3. Filter & rank clubs based on user yes_tags
     #    Example partial_threshold = 0.5 (require at least 50% of user’s yes-tags to match)
     partial_threshold = 0.1
-    matched_clubs = filter_and_rank_clubs(clubs, yes_tags, partial_threshold=partial_threshold)
+    #    Each of the user's no-tags a club has costs it half a matched tag in the ranking
+    matched_clubs = filter_and_rank_clubs(clubs, yes_tags, partial_threshold=partial_threshold, tag_index=tag_index,
+                                          no_tags=no_tags, no_penalty=0.5)
 
     # 4. Display matched clubs
     print(
@@ -0,0 +1,178 @@
+import csv
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+
+# One-pass, typed loader for the club CSVs the matchers read, kept as parallel arrays:
+#   tag files (matchmaking.py, App.py: name, description, tag ids like "3;20;8" or "3,20,8")
+#       names, descriptions, and the tags as CSR: club i has tag_ids[tag_offsets[i]:tag_offsets[i + 1]]
+#   score files (MatchmakingWithTags.py: Club Name plus one float column per tag)
+#       names, plus a C-order float32 clubs x tags matrix whose columns are listed in score_columns
+# Each parse is saved next to its CSV (clubs.csv -> clubs.clubtable.npz). It's reused while the
+# CSV is unchanged: the same size and mtime, or failing that (e.g. a fresh checkout), the same sha1.
+
+TABLE_VERSION = 1
+NAME_COLUMN = "Club Name"
+# Rows read to tell the text columns of a score file from its float columns
+DTYPE_SAMPLE_ROWS = 1000
+
+
+def table_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".clubtable.npz"
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ClubTable:
+    """Clubs as parallel arrays: names, and either descriptions and tag CSR, or a score matrix."""
+
+    ARRAYS = ("names", "descriptions", "tag_offsets", "tag_ids", "scores", "score_columns")
+
+    def __init__(self, names, descriptions=None, tag_offsets=None, tag_ids=None, scores=None, score_columns=None):
+        self.names = names
+        self.descriptions = descriptions
+        self.tag_offsets = tag_offsets
+        self.tag_ids = tag_ids
+        self.scores = scores
+        self.score_columns = score_columns
+        # A repeated column name resolves to its first column, like ScoreArtifact
+        self.column_positions = {}
+        for position, column in enumerate(score_columns if score_columns is not None else []):
+            self.column_positions.setdefault(str(column), position)
+
+    def __len__(self):
+        return len(self.names)
+
+    def tags(self, row):
+        return self.tag_ids[self.tag_offsets[row]:self.tag_offsets[row + 1]]
+
+    def columns(self, names):
+        """rows x len(names) scores; the full matrix itself if names are all its columns in order."""
+        positions = [self.column_positions[name] for name in names]
+        if positions == list(range(len(self.score_columns))):
+            return self.scores
+        return self.scores[:, positions]
+
+    def to_dicts(self):
+        """[{"name": str, "description": str, "tags": [int, ...]}, ...], what load_clubs_from_csv returned."""
+        tags = np.split(self.tag_ids, self.tag_offsets[1:-1])
+        return [{"name": name, "description": description, "tags": club_tags.tolist()}
+                for name, description, club_tags in zip(self.names.tolist(), self.descriptions.tolist(), tags)]
+
+
+def parse_tag_csv(csv_path):
+    """Reads a name, description, tag ids file into a ClubTable in one pass over the rows."""
+    names, descriptions, tag_ids, tag_offsets = [], [], [], [0]
+    with open(csv_path, mode='r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            # A club with no tags may have no third field at all
+            tag_str = row[2] if len(row) > 2 else ""
+            names.append(row[0].strip())
+            descriptions.append(row[1].strip() if len(row) > 1 else "")
+            # Semicolon-separated if there's a semicolon, otherwise comma-separated
+            tag_ids.extend(int(x) for x in tag_str.split(";" if ";" in tag_str else ",") if x.strip().isdigit())
+            tag_offsets.append(len(tag_ids))
+    return ClubTable(np.array(names, dtype=str), np.array(descriptions, dtype=str),
+                     np.array(tag_offsets, dtype=np.int64), np.array(tag_ids, dtype=np.int32))
+
+
+def parse_score_csv(csv_path):
+    """
+    Reads a scored clubs file into a ClubTable: Club Name plus every float column as float32.
+    The other text columns are dropped. Dtypes are given to read_csv up front (from a sample
+    of rows), so the float columns are parsed straight to float32 with no inference pass.
+    """
+    import pandas as pd
+
+    sample = pd.read_csv(csv_path, nrows=DTYPE_SAMPLE_ROWS)
+    numeric = [column for column, dtype in sample.dtypes.items() if dtype.kind in "fiub"]
+    dtypes = {column: (np.float32 if column in numeric else str) for column in sample.columns}
+    df = pd.read_csv(csv_path, dtype=dtypes, usecols=[NAME_COLUMN] + numeric)
+    return ClubTable(df[NAME_COLUMN].fillna("").to_numpy(dtype=str),
+                     scores=np.ascontiguousarray(df[numeric].to_numpy(dtype=np.float32)),
+                     score_columns=np.array(numeric, dtype=str))
+
+
+def save_table(table, csv_path, kind):
+    stat = os.stat(csv_path)
+    arrays = {name: getattr(table, name) for name in ClubTable.ARRAYS if getattr(table, name) is not None}
+    # Written under a temporary name so an interrupted save never leaves a half-written sidecar
+    tmp_path = table_path(csv_path) + ".tmp.npz"
+    np.savez(tmp_path, kind=kind, version=TABLE_VERSION, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+             sha1=file_sha1(csv_path), **arrays)
+    os.replace(tmp_path, table_path(csv_path))
+
+
+def load_cached_table(csv_path, kind):
+    """The sidecar's ClubTable if it was built by the same kind of parse from this CSV's contents, else None."""
+    if not os.path.exists(table_path(csv_path)):
+        return None
+    stat = os.stat(csv_path)
+    with np.load(table_path(csv_path)) as cached:
+        if str(cached["kind"]) != kind or int(cached["version"]) != TABLE_VERSION:
+            return None
+        unchanged = (int(cached["size"]), int(cached["mtime_ns"])) == (stat.st_size, stat.st_mtime_ns)
+        if not unchanged and str(cached["sha1"]) != file_sha1(csv_path):
+            return None
+        table = ClubTable(**{name: cached[name] for name in ClubTable.ARRAYS if name in cached.files})
+    if not unchanged:
+        # Same contents with a new mtime: record it so the next load skips the hash
+        try_save_table(table, csv_path, kind)
+    return table
+
+
+def try_save_table(table, csv_path, kind):
+    """save_table, skipped where the CSV's directory isn't writable (the sidecar is only a speedup)."""
+    try:
+        save_table(table, csv_path, kind)
+    except OSError as error:
+        print(f"Not caching {csv_path}: {error}")
+
+
+def _load_table(csv_path, kind, parse):
+    table = load_cached_table(csv_path, kind)
+    if table is None:
+        table = parse(csv_path)
+        try_save_table(table, csv_path, kind)
+    return table
+
+
+def load_tag_table(csv_path):
+    """ClubTable of a name, description, tag ids file (clubs.csv), parsed only if the CSV changed."""
+    return _load_table(csv_path, "tags", parse_tag_csv)
+
+
+def load_score_table(csv_path):
+    """ClubTable of a Club Name plus tag scores file (FinalWinterClubScores.csv), parsed only if the CSV changed."""
+    return _load_table(csv_path, "scores", parse_score_csv)
+
+
+def main():
+    # python ClubLoader.py [ClubsScoredOnTags.csv] [--tags] compares parsing the CSV with loading its sidecar
+    csv_path = next((arg for arg in sys.argv[1:] if arg.endswith(".csv")), "ClubsScoredOnTags.csv")
+    kind, parse = ("tags", parse_tag_csv) if "--tags" in sys.argv else ("scores", parse_score_csv)
+
+    start = time.perf_counter()
+    table = parse(csv_path)
+    parse_seconds = time.perf_counter() - start
+    save_table(table, csv_path, kind)
+
+    start = time.perf_counter()
+    table = load_cached_table(csv_path, kind)
+    load_seconds = time.perf_counter() - start
+    print(f"{csv_path}: {len(table)} clubs, parsed in {parse_seconds * 1000:.1f} ms; "
+          f"{table_path(csv_path)}: {os.path.getsize(table_path(csv_path)):,} bytes, loaded in {load_seconds * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import csv
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
+from ClubLoader import load_score_table
+
 # 1. DEFINE TAGS AND BROAD CATEGORIES
 
 '''HAVE TO CHANGE ALL OF THIS AND IMPORT IT FROM APP JS'''
@@ -226,32 +227,114 @@ def get_yes_no(prompt):
         else:
             print("Please answer 'yes' or 'no'.")
 
-def calculate_similarity(user_scores, club_scores):
-    user_vector = np.array([user_scores.loc[0, ALL_TAGS[tag_id][0]] for tag_id in ALL_TAGS])
-    club_vector = np.array([club_scores[ALL_TAGS[tag_id][0]] for tag_id in ALL_TAGS])
-
-    similarity = cosine_similarity([user_vector], [club_vector])[0][0] 
-    return similarity
-
-def rank_clubs_by_similarity(user_scores : pd.DataFrame, clubs_scored : pd.DataFrame):
-    ranked_clubs = []
-    for index, club in clubs_scored.iterrows():
-        similarity = calculate_similarity(user_scores, club)
-        ranked_clubs.append({
-            "Club Name": club["Club Name"],
-            "similarity": similarity
-        })
-    
-    ranked_clubs.sort(key=lambda x: x["similarity"], reverse=True)
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1  # all-zero rows stay zero, same as sklearn's cosine_similarity
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+class ClubMatcher:
+    """
+    Holds every club's tag scores as one pre-normalized, contiguous float32 matrix so ranking
+    a user is a single matrix-vector product plus argpartition for the top k.
+    """
+
+    def __init__(self, clubs_scored : pd.DataFrame, tag_columns=None):
+        if tag_columns is None:
+            tag_columns = [ALL_TAGS[tag_id][0] for tag_id in ALL_TAGS]
+        self.tag_columns = list(tag_columns)
+        self.club_names = clubs_scored["Club Name"].to_numpy()
+        self.club_matrix = normalize_rows(clubs_scored[self.tag_columns].to_numpy(dtype=np.float32))
+
+    @classmethod
+    def from_csv(cls, csv_filename, tag_columns=None):
+        """Parses the CSV once with float32 dtypes (ClubLoader); later starts read its binary sidecar."""
+        return cls.from_table(load_score_table(csv_filename), tag_columns)
+
+    @classmethod
+    def from_table(cls, table, tag_columns=None):
+        """Builds from a ClubLoader score table."""
+        if tag_columns is None:
+            tag_columns = [ALL_TAGS[tag_id][0] for tag_id in ALL_TAGS]
+        matcher = cls.__new__(cls)
+        matcher.tag_columns = list(tag_columns)
+        matcher.club_names = table.names.astype(object)
+        matcher.club_matrix = normalize_rows(table.columns(matcher.tag_columns))
+        return matcher
+
+    @classmethod
+    def from_artifact(cls, artifact, tag_columns=None):
+        """Builds from a ScoreArtifact (the tagging outputs' binary twin) without parsing any CSV."""
+        matcher = cls.__new__(cls)
+        matcher.tag_columns = list(tag_columns if tag_columns is not None else artifact.score_columns)
+        matcher.club_names = np.asarray(artifact.metadata["Club Name"], dtype=object)
+        matcher.club_matrix = normalize_rows(artifact.columns(matcher.tag_columns))
+        return matcher
+
+    def user_vector(self, user_scores : pd.DataFrame):
+        # Left unnormalized; top_k_many normalizes, so batch and single rankings see identical floats
+        return user_scores.loc[0, self.tag_columns].to_numpy(dtype=np.float32)
+
+    def user_matrix(self, user_score_dfs):
+        """Stacks many get_user_tags_df-style one-row DataFrames into an N x T matrix."""
+        return np.vstack([user_scores.loc[0, self.tag_columns].to_numpy(dtype=np.float32)
+                          for user_scores in user_score_dfs])
+
+    def top_k(self, user_vector, k=10):
+        """Returns (club indices, similarities) of the k best clubs, best first. Ties keep CSV order."""
+        top, similarities = self.top_k_many(np.asarray(user_vector).reshape(1, -1), k)
+        return top[0], similarities[0]
+
+    def top_k_many(self, user_matrix, k=10, chunk_size=2048):
+        """
+        Ranks N users at once. user_matrix is N x T (rows don't need to be normalized).
+        Returns N x k arrays of club indices and similarities, best first. Users are scored
+        chunk_size at a time so memory stays at chunk_size x clubs floats.
+        """
+        user_matrix = normalize_rows(np.asarray(user_matrix).reshape(-1, len(self.tag_columns)))
+        k = min(k, len(self.club_matrix))
+        top = np.empty((len(user_matrix), k), dtype=np.int64)
+        top_similarities = np.empty((len(user_matrix), k), dtype=np.float32)
+        if k == 0:
+            return top, top_similarities
+
+        for start in range(0, len(user_matrix), chunk_size):
+            # einsum instead of BLAS matmul: BLAS picks different kernels (and summation orders)
+            # for 1 row vs many, which would let a batch disagree with top_k in the last bit
+            similarities = np.einsum("ut,ct->uc", user_matrix[start:start + chunk_size], self.club_matrix)
+            candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            candidate_similarities = np.take_along_axis(similarities, candidates, axis=1)
+            order = np.lexsort((candidates, -candidate_similarities))
+            chunk_top = np.take_along_axis(candidates, order, axis=1)
+
+            # argpartition picks arbitrarily among clubs tied with the k-th best, so those rows
+            # take everything tied and resolve by row order like a stable sort
+            kth_best = np.take_along_axis(similarities, chunk_top[:, -1:], axis=1)
+            for row in np.flatnonzero((similarities >= kth_best).sum(axis=1) > k):
+                tied = np.flatnonzero(similarities[row] >= kth_best[row, 0])
+                chunk_top[row] = tied[np.lexsort((tied, -similarities[row, tied]))[:k]]
+
+            top[start:start + len(chunk_top)] = chunk_top
+            top_similarities[start:start + len(chunk_top)] = np.take_along_axis(similarities, chunk_top, axis=1)
+        return top, top_similarities
+
+    def rank(self, user_scores : pd.DataFrame, k=10):
+        top, similarities = self.top_k(self.user_vector(user_scores), k)
+        return [{"Club Name": self.club_names[index], "similarity": similarity}
+                for index, similarity in zip(top, similarities)]
 
-    return ranked_clubs[:10]
+def rank_clubs_by_similarity(user_scores : pd.DataFrame, clubs_scored):
+    """clubs_scored can be a ClubMatcher (built once and reused) or the raw scores DataFrame."""
+    if not isinstance(clubs_scored, ClubMatcher):
+        clubs_scored = ClubMatcher(clubs_scored)
+    return clubs_scored.rank(user_scores, k=10)
 
 
 # 3. MAIN SCRIPT
 def main():
     # Load clubs from CSV
     csv_filename = "FinalWinterClubScores.csv"
-    club_scores = pd.read_csv(csv_filename)
+    matcher = ClubMatcher.from_csv(csv_filename)
     
     # Collect user responses and scores
     user_tags = get_user_tags_df(ALL_TAGS, CATEGORY_QUESTIONS)
@@ -260,7 +343,7 @@ def main():
     print(user_tags, "\n\n")
 
     # Rank clubs by similarity
-    matched_clubs = rank_clubs_by_similarity(user_tags, club_scores)
+    matched_clubs = rank_clubs_by_similarity(user_tags, matcher)
 
     # Display the top 10 most similar clubs
     print("\nHere are the top 10 clubs that match your interests:")
@@ -1,98 +1,283 @@
 '''Import Libraries'''
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 import nltk
 from nltk.corpus import stopwords
 
-# from pywsd.utils import lemmatize_sentence # Comment out when not using because it takes a while to initialize when testing
+# pywsd's lemmatize_sentence is imported on first use in lemmatize_word, because it takes a
+# while to initialize
 
 from gensim.models import Word2Vec
 
 
-'''Import Data'''
-df = pd.read_csv("DataWithoutOrgsLemANDLower.csv")
+'''Clean Up/Standardize CSV'''
+PUNCTUATION = [".", "!", "?", ",", ";", ":", "(", ")", "[", "]", "{", "}", "'", '"', "’", "‘", "“", "”"]
+# "kappa" "epsilon" were missing a comma, so the stopword was "kappaepsilon"; kept as-is so the
+# trained model's vocabulary doesn't change
+DESCRIPTION_STOPWORDS = [".", ",", "poly", "cal", "slo", "san", "luis", "obispo", "organization", "sigma", "chi",
+                         "omega", "beta", "theta", "pi", "phi", "kappa" "epsilon", "alpha", "zeta", "tau", "nu", "club"]
 
+# Below this many descriptions normalize_texts stays in-process; starting workers costs more
+PARALLEL_MIN_TEXTS = 2000
+PARALLEL_CHUNK_SIZE = 500
 
-'''Clean Up/Standardize CSV'''
-def lemmatize_desc(description):
-    new_description = ""
-    stopwords_set = set(stopwords.words('english'))
-    punctuation = [".", "!", "?", ",", ";", ":", "(", ")", "[", "]", "{", "}", "'", '"', "’", "‘", "“", "”"]
-    for word in punctuation:
-        stopwords_set.add(word)
 
-    if not isinstance(description, str):
-        return ""
-    
-    words_list = nltk.word_tokenize(description)
-    for word in words_list:
-        if not word.isdigit() and word.lower() not in stopwords_set:
-            new_description += " " + lemmatize_sentence(word.lower())[0]
-    return new_description
+@lru_cache(maxsize=None)
+def stopword_set(kind):
+    """English stopwords plus the extra words for kind ("lemmatize" or "description"), built once per process."""
+    extra = PUNCTUATION if kind == "lemmatize" else DESCRIPTION_STOPWORDS
+    return frozenset(stopwords.words('english')).union(extra)
 
-def preprocessing_descs(description):
+
+@lru_cache(maxsize=None)
+def lemmatize_word(word):
+    # Memoized word -> lemma table: each distinct word is lemmatized once per process
+    from pywsd.utils import lemmatize_sentence
+
+    return lemmatize_sentence(word)[0]
+
+
+def normalize_text(description, kind):
+    """Tokenizes, drops digits and stopwords, lowercases and lemmatizes, e.g. " mission reach community"."""
     if not isinstance(description, str):
         return ""
-    
-    add_to_stopwords = [".", ",", "poly", "cal", "slo", "san", "luis", "obispo", "organization", "sigma", "chi", 
-                        "omega", "beta", "theta", "pi", "phi", "kappa" "epsilon", "alpha", "zeta", "tau", "nu", "club"]
-    stopwords_set = set(stopwords.words('english'))
-    new_description = ""
+    stopwords_set = stopword_set(kind)
+    return "".join(" " + lemmatize_word(word.lower()) for word in nltk.word_tokenize(description)
+                   if not word.isdigit() and word.lower() not in stopwords_set)
 
-    for word in add_to_stopwords:
-        stopwords_set.add(word)
 
-    words_list = nltk.word_tokenize(description)
+def _normalize_chunk(args):
+    descriptions, kind = args
+    return [normalize_text(description, kind) for description in descriptions]
 
-    for word in words_list:
-        if not word.isdigit() and word.lower() not in stopwords_set:
-            new_description = new_description + " " + lemmatize_sentence(word.lower())[0]
-    return new_description
 
-def preprocessing_names(name):
-    new_name = ""
+def normalize_texts(descriptions, kind="description", workers=None):
+    """
+    normalize_text over a whole column. Large corpora are split into chunks across a process
+    pool (each worker builds its stopwords and lemma table once); results keep the input order.
+    """
+    descriptions = list(descriptions)
+    if len(descriptions) < PARALLEL_MIN_TEXTS:
+        return _normalize_chunk((descriptions, kind))
 
+    chunks = [(descriptions[start:start + PARALLEL_CHUNK_SIZE], kind)
+              for start in range(0, len(descriptions), PARALLEL_CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return [text for chunk in pool.map(_normalize_chunk, chunks) for text in chunk]
+
+
+def lemmatize_desc(description):
+    return normalize_text(description, "lemmatize")
+
+def preprocessing_descs(description):
+    return normalize_text(description, "description")
+
+def preprocessing_names(name):
     if not isinstance(name, str):
         return ""
+    return "".join(" " + (word if word.isdigit() else word.lower()) for word in nltk.word_tokenize(name))
 
-    words_list = nltk.word_tokenize(name) 
+def main(df):
+    df['New Club Name'] = [preprocessing_names(name) for name in df['New Club Name']]
+    df['New Description'] = normalize_texts(df['New Description'], "description")
 
-    for word in words_list:
-        if not word.isdigit():
-            new_name = new_name + " " + word.lower()
-        else:
-            new_name = new_name + " " + word
-    return new_name
 
-def main(df):
-    df['New Club Name'] = df['New Club Name'].apply(preprocessing_names)
-    df['New Description'] = df['New Description'].apply(preprocessing_descs)
 
-# main(df)
-# df.to_csv('NewScrapedData2.csv')
+'''Creating Tags'''
+# Word2Vec threads; gensim's workers scale until about one per core
+TRAIN_WORKERS = os.cpu_count() or 1
+KEY_COLUMN = "tablescraper-selected-row href"
+
 
+class DescriptionCorpus:
+    """
+    Restartable stream of tokenized descriptions for Word2Vec: every iteration (gensim makes
+    one for the vocabulary and one per epoch) reads the CSV again in chunks, so memory stays
+    flat however many campuses are in it.
 
+    With a token_cache path, the first full pass also writes one space-separated line of
+    tokens per description there, and later passes read that file instead of re-tokenizing.
+    exclude_keys skips clubs (by KEY_COLUMN) already trained on, for update_vecmodel.
+    """
 
-'''Creating Tags'''
-cleaned_up_df = pd.read_csv('NewScrapedData.csv')
-
-def create_vecmodel(csv_file):
-    descriptions = []
-    for description in csv_file['New Description']:
-        if isinstance(description, str):
-            descriptions.append(nltk.word_tokenize(description))
-    
-    model = Word2Vec(sentences=descriptions, workers=4, window=10, vector_size=100, epochs = 5, min_count=1) 
+    def __init__(self, csv_path, column='New Description', token_cache=None, exclude_keys=(), chunk_rows=5000):
+        self.csv_path = csv_path
+        self.column = column
+        self.token_cache = token_cache
+        self.exclude_keys = set(exclude_keys)
+        self.chunk_rows = chunk_rows
+
+    def keys(self):
+        """KEY_COLUMN of every club this corpus yields, in order."""
+        keys = []
+        for chunk in pd.read_csv(self.csv_path, usecols=[KEY_COLUMN, self.column], chunksize=self.chunk_rows):
+            keys.extend(key for key, description in zip(chunk[KEY_COLUMN], chunk[self.column])
+                        if isinstance(description, str) and key not in self.exclude_keys)
+        return keys
+
+    def _tokenized(self):
+        usecols = [self.column, KEY_COLUMN] if self.exclude_keys else [self.column]
+        for chunk in pd.read_csv(self.csv_path, usecols=usecols, chunksize=self.chunk_rows):
+            keys = chunk[KEY_COLUMN] if self.exclude_keys else [None] * len(chunk)
+            for key, description in zip(keys, chunk[self.column]):
+                if isinstance(description, str) and key not in self.exclude_keys:
+                    yield nltk.word_tokenize(description)
+
+    def __iter__(self):
+        cache_is_fresh = (self.token_cache and os.path.exists(self.token_cache)
+                          and os.path.getmtime(self.token_cache) >= os.path.getmtime(self.csv_path))
+        if cache_is_fresh:
+            with open(self.token_cache, encoding="utf-8") as f:
+                for line in f:
+                    yield line.split()
+            return
+
+        if not self.token_cache:
+            yield from self._tokenized()
+            return
+
+        # Written to a temporary name so a pass gensim abandons midway leaves no partial cache
+        tmp_path = self.token_cache + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for tokens in self._tokenized():
+                f.write(" ".join(tokens) + "\n")
+                yield tokens
+        os.replace(tmp_path, self.token_cache)
+
+
+def create_vecmodel(corpus, workers=TRAIN_WORKERS):
+    """corpus is a DescriptionCorpus (or any restartable iterable of token lists), or a DataFrame as before."""
+    if isinstance(corpus, pd.DataFrame):
+        corpus = [nltk.word_tokenize(description) for description in corpus['New Description']
+                  if isinstance(description, str)]
+    model = Word2Vec(sentences=corpus, workers=workers, window=10, vector_size=100, epochs = 5, min_count=1)
     return model
 
-cur_model = create_vecmodel(cleaned_up_df)
-cur_model.save('ModelOnNewData.model')
+
+def update_vecmodel(model, new_corpus):
+    """Adds new clubs' words to a trained model's vocabulary and trains on just those clubs."""
+    model.build_vocab(new_corpus, update=True)
+    model.train(new_corpus, total_examples=model.corpus_count, epochs=model.epochs)
+    return model
+
+
+def trained_keys_path(model_path):
+    return model_path + ".clubs.txt"
+
+
+def save_trained_keys(model_path, keys):
+    with open(trained_keys_path(model_path), "a", encoding="utf-8") as f:
+        f.writelines(key + "\n" for key in keys)
+
+
+def load_trained_keys(model_path):
+    if not os.path.exists(trained_keys_path(model_path)):
+        return set()
+    with open(trained_keys_path(model_path), encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f}
+
+
+'''Serving the vectors'''
+KEYED_VECTORS_PATH = 'ModelOnNewData.kv'
+
+
+def normed_vectors_path(path):
+    return path + ".normed.npy"
+
+
+def export_keyed_vectors(model, path=KEYED_VECTORS_PATH):
+    """
+    Saves just model.wv (no training state) with the vector matrix in its own .npy file, plus
+    a unit-normalized copy of it, so TagVectors can memory-map both.
+    """
+    model.wv.save(path, separately=["vectors"])
+    normed_tmp = normed_vectors_path(path) + ".tmp.npy"
+    np.save(normed_tmp, model.wv.get_normed_vectors().astype(np.float32))
+    os.replace(normed_tmp, normed_vectors_path(path))
+
+
+class TagVectors:
+    """
+    Read-only word vectors for matchers and workers. The KeyedVectors and the normalized matrix
+    are memory-mapped, so every process shares one copy through the page cache and loading
+    only reads the vocabulary. most_similar and similarity use the normalized matrix directly.
+    """
+
+    def __init__(self, path=KEYED_VECTORS_PATH):
+        from gensim.models import KeyedVectors
+
+        self.kv = KeyedVectors.load(path, mmap='r')
+        self.normed = np.load(normed_vectors_path(path), mmap_mode='r')
+
+    def __contains__(self, word):
+        return word in self.kv.key_to_index
+
+    def similarity(self, word1, word2):
+        return float(self.normed[self.kv.key_to_index[word1]] @ self.normed[self.kv.key_to_index[word2]])
+
+    def most_similar(self, positive=(), negative=(), topn=10):
+        """Same words and scores as KeyedVectors.most_similar, without recomputing norms per call."""
+        if isinstance(positive, str):
+            positive = [positive]
+        if isinstance(negative, str):
+            negative = [negative]
+        indices = [self.kv.key_to_index[word] for word in list(positive) + list(negative)]
+        weights = np.array([1.0] * len(positive) + [-1.0] * len(negative), dtype=np.float32)
+        query = weights @ self.normed[indices]
+        query /= np.linalg.norm(query)
+
+        similarities = self.normed @ query
+        similarities[indices] = -np.inf  # the query words themselves are never results
+        topn = min(topn, len(similarities) - len(set(indices)))
+        best = np.argpartition(-similarities, topn - 1)[:topn]
+        best = best[np.argsort(-similarities[best], kind="stable")]
+        return [(self.kv.index_to_key[i], float(similarities[i])) for i in best]
+
+
+if __name__ == "__main__":
+    # Only when run as a script, so importing the preprocessing functions (e.g. from a worker
+    # process) doesn't reload the CSVs and retrain the model
+    import sys
+
+    '''Import Data'''
+    # df = pd.read_csv("DataWithoutOrgsLemANDLower.csv")
+    # main(df)
+    # df.to_csv('NewScrapedData2.csv')
+
+    model_path = 'ModelOnNewData.model'
+    if "--update" in sys.argv and os.path.exists(model_path):
+        # python TagCreation.py --update: train the saved model on clubs it hasn't seen yet
+        if not os.path.exists(trained_keys_path(model_path)):
+            # Without the list every club looks new, and the model would train on the whole corpus twice
+            sys.exit(f"{trained_keys_path(model_path)} is missing, so it's unknown which clubs {model_path} "
+                     f"was trained on; run python TagCreation.py once without --update")
+        new_clubs = DescriptionCorpus('NewScrapedData.csv', exclude_keys=load_trained_keys(model_path))
+        new_keys = new_clubs.keys()
+        print(f"Updating {model_path} with {len(new_keys)} new clubs")
+        if new_keys:
+            cur_model = update_vecmodel(Word2Vec.load(model_path), new_clubs)
+            cur_model.save(model_path)
+            export_keyed_vectors(cur_model)
+            save_trained_keys(model_path, new_keys)
+    else:
+        corpus = DescriptionCorpus('NewScrapedData.csv', token_cache='NewScrapedData.tokens.txt')
+        cur_model = create_vecmodel(corpus)
+        cur_model.save(model_path)
+        export_keyed_vectors(cur_model)
+        if os.path.exists(trained_keys_path(model_path)):
+            os.remove(trained_keys_path(model_path))
+        save_trained_keys(model_path, corpus.keys())
 
 # list_of_words = ["team", "compete", "competitive", "play", "offer", "competes", "woman", 
 #     "collegiate", "california", "join", "level", "travel", "competition", 
 #     "player", "new", "league", "game", "national", "welcome", "throughout"]
 
-# similar_words_list = cur_model.wv.most_similar(positive=list_of_words)
+# similar_words_list = TagVectors().most_similar(positive=list_of_words)
 
 # print(similar_words_list)
 
-# print(cur_model.wv.similarity('french', 'eco'))
\ No newline at end of file
+# print(TagVectors().similarity('french', 'eco'))
\ No newline at end of file
@@ -1,7 +1,8 @@
-import csv
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
+from ClubLoader import load_tag_table
+
 # 1. DEFINE TAGS AND BROAD CATEGORIES
 ALL_TAGS = {
     1: "Community Service",
@@ -126,29 +127,8 @@ CATEGORY_QUESTIONS = {
 
 # 2. HELPER FUNCTIONS
 def load_clubs_from_csv(filename):
-    """Loads clubs from a CSV file."""
-    clubs = []
-    with open(filename, mode='r', encoding='utf-8-sig') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if not row:
-                continue
-            club_name = row[0].strip()
-            description = row[1].strip()
-            tag_str = row[2].strip()
-
-            # Split tags by semicolon or comma
-            if ";" in tag_str:
-                tag_list = [int(x) for x in tag_str.split(";") if x.strip().isdigit()]
-            else:
-                tag_list = [int(x) for x in tag_str.split(",") if x.strip().isdigit()]
-
-            clubs.append({
-                "name": club_name,
-                "description": description,
-                "tags": tag_list
-            })
-    return clubs
+    """Loads clubs from a CSV file (parsed once by ClubLoader, then read from its binary sidecar)."""
+    return load_tag_table(filename).to_dicts()
 
 def get_yes_no(prompt):
     while True:
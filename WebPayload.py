@@ -0,0 +1,122 @@
+import base64
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from ScoreArtifact import ScoreArtifact, artifact_paths, read_output_csv, write_artifact
+
+# Where my-app fetches its club data from
+WEB_DIR = os.path.join("my-app", "public", "csv_folder")
+# Text columns only shown after a result is opened; they go to a separate, lazily fetched file
+LAZY_COLUMNS = ("Description",)
+QUANTIZATION_LEVELS = 255
+
+
+def quantize_scores(scores):
+    """[0, 1] scores (MinMax scaled, thresholded tags are exactly 0 or 1) -> uint8, 1/510 max error."""
+    return np.rint(np.clip(np.asarray(scores, dtype=np.float32), 0, 1) * QUANTIZATION_LEVELS).astype(np.uint8)
+
+
+def dequantize_scores(quantized):
+    return quantized.astype(np.float32) / QUANTIZATION_LEVELS
+
+
+def payload_paths(output_csv, web_dir=WEB_DIR):
+    stem = os.path.join(web_dir, os.path.splitext(os.path.basename(output_csv))[0])
+    return stem + ".web.json", stem + ".descriptions.json"
+
+
+def build_payload(artifact):
+    """
+    (payload, lazy payload) dicts for a ScoreArtifact. The payload has one shared column
+    header and every score as a uint8 in a single base64 string, row-major:
+        {"columns": [...], "levels": 255, "rows": n, "scores": "<base64>", "Club Name": [...], "links": [...]}
+    score = byte / levels. Rows line up with the lazy payload's per-column lists.
+    """
+    quantized = quantize_scores(artifact.scores)
+    payload = {"columns": artifact.score_columns, "levels": QUANTIZATION_LEVELS, "rows": len(artifact),
+               "scores": base64.b64encode(np.ascontiguousarray(quantized).tobytes()).decode("ascii")}
+    lazy = {}
+    for column, values in artifact.metadata.items():
+        (lazy if column in LAZY_COLUMNS else payload)[column] = values
+    return payload, lazy
+
+
+def parse_payload(payload_text):
+    """What the client does on load: JSON.parse plus decoding the score bytes. Returns (columns, scores)."""
+    payload = json.loads(payload_text)
+    quantized = np.frombuffer(base64.b64decode(payload["scores"]), dtype=np.uint8)
+    return payload["columns"], dequantize_scores(quantized.reshape(payload["rows"], len(payload["columns"])))
+
+
+def write_payload(output_csv, web_dir=WEB_DIR):
+    """Writes output_csv's web payload and lazy descriptions file from its score artifact."""
+    if not os.path.exists(artifact_paths(output_csv)[1]):
+        write_artifact(read_output_csv(output_csv), output_csv)
+    artifact = ScoreArtifact(output_csv)
+    payload, lazy = build_payload(artifact)
+
+    payload_path, lazy_path = payload_paths(output_csv, web_dir)
+    os.makedirs(web_dir, exist_ok=True)
+    for path, data in ((payload_path, payload), (lazy_path, lazy)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+    return artifact, payload_path, lazy_path
+
+
+def report(output_csv, artifact, payload_path, lazy_path):
+    """
+    Bytes shipped (raw and gzipped, as the dev server and most hosts send them) and parse time
+    of the CSV the app fetches today vs the new payload. Parse times are measured in Python as
+    a stand-in for the browser: csv.reader (strings only, like the app's Papa.parse settings)
+    vs json.loads plus decoding the score bytes.
+    """
+    import csv
+    import io
+
+    def sizes(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        return len(data), len(gzip.compress(data))
+
+    def best_of(parse, repeats=5):
+        seconds = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            parse()
+            seconds.append(time.perf_counter() - start)
+        return min(seconds) * 1000
+
+    with open(output_csv, encoding="utf-8", newline="") as f:
+        csv_text = f.read()
+    with open(payload_path, encoding="utf-8") as f:
+        payload_text = f.read()
+
+    csv_ms = best_of(lambda: list(csv.reader(io.StringIO(csv_text))))
+    payload_ms = best_of(lambda: parse_payload(payload_text))
+    _, scores = parse_payload(payload_text)
+    max_error = float(np.abs(scores - np.asarray(artifact.scores)).max()) if len(scores) else 0.0
+
+    csv_bytes, csv_gzip = sizes(output_csv)
+    payload_bytes, payload_gzip = sizes(payload_path)
+    lazy_bytes, lazy_gzip = sizes(lazy_path)
+    print(f"{output_csv}: {csv_bytes:,} bytes ({csv_gzip:,} gzipped), parsed in {csv_ms:.1f} ms")
+    print(f"{payload_path}: {payload_bytes:,} bytes ({payload_gzip:,} gzipped, "
+          f"{payload_gzip / csv_gzip:.0%} of the CSV), parsed in {payload_ms:.1f} ms, max score error {max_error:.4f}")
+    print(f"{lazy_path}: {lazy_bytes:,} bytes ({lazy_gzip:,} gzipped), fetched after the first result")
+
+
+def main():
+    # Run after AllTagging.py (or TaggingPipeline.py):
+    # python WebPayload.py [44TagsWithIdentity.csv] [--web-dir my-app/public/csv_folder]
+    web_dir = sys.argv[sys.argv.index("--web-dir") + 1] if "--web-dir" in sys.argv else WEB_DIR
+    csvs = [arg for arg in sys.argv[1:] if arg.endswith(".csv")] or ["44TagsWithIdentity.csv"]
+    for output_csv in csvs:
+        report(output_csv, *write_payload(output_csv, web_dir))
+
+if __name__ == "__main__":
+    main()
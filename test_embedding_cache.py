@@ -0,0 +1,17 @@
+import numpy as np
+
+from EmbeddingCache import EmbeddingStore
+
+
+def test_stores_sharing_a_directory_keep_each_others_shards(tmp_path):
+    # Two processes that opened the same store before either wrote to it
+    first = EmbeddingStore("model", cache_dir=str(tmp_path))
+    second = EmbeddingStore("model", cache_dir=str(tmp_path))
+    first.add(["robotics"], np.full((1, 4), 1.0))
+    second.add(["dance"], np.full((1, 4), 2.0))
+    first.add(["chess"], np.full((1, 4), 3.0))
+
+    reopened = EmbeddingStore("model", cache_dir=str(tmp_path))
+    assert len(reopened.shard_files) == 3
+    assert reopened.get(["robotics", "dance", "chess"])[:, 0].tolist() == [1.0, 2.0, 3.0]
+    assert first.get(["dance"])[0, 0] == 2.0
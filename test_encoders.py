@@ -0,0 +1,28 @@
+import numpy as np
+
+from Encoders import bucketed_encode, token_lengths
+
+
+class StrictTokenizerModel:
+    """Tokenizes like a Hugging Face fast tokenizer (strings only); embeds a text as [len(text)]."""
+
+    max_seq_length = 8
+
+    def tokenizer(self, texts, add_special_tokens=True, truncation=False, max_length=None):
+        for text in texts:
+            if not isinstance(text, str):
+                raise TypeError("TextEncodeInput must be Union[TextInputSequence, Tuple[InputSequence, InputSequence]]")
+        return {"input_ids": [[0] * min(len(text.split()) + 2, max_length) for text in texts]}
+
+    def encode(self, texts, **kwargs):
+        return np.array([[float(len(str(text)))] for text in texts], dtype=np.float32)
+
+
+def test_nan_description_is_tokenized_as_a_string():
+    assert token_lengths(StrictTokenizerModel(), ["a club", float("nan")]).tolist() == [4, 3]
+
+
+def test_bucketed_encode_keeps_order_with_a_nan_description():
+    texts = ["a much longer club description", float("nan"), "short"]
+    embeddings = bucketed_encode(StrictTokenizerModel(), texts, token_budget=8, report=False)
+    assert embeddings[:, 0].tolist() == [float(len(str(text))) for text in texts]
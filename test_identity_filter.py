@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from IdentityFilter import IDENTITY_COLUMNS, INTEREST_COLUMNS, IdentityFilter
+
+
+def scored_clubs():
+    """Four clubs open to everyone except: a Greek one, an LGBTQ+ one and a women-only one."""
+    df = pd.DataFrame({"Club Name": ["Open", "Greek", "Pride", "Women"]})
+    for column in INTEREST_COLUMNS:
+        df[column] = 0.5
+    for column in IDENTITY_COLUMNS:
+        df[column] = 0.0 if column in ("Greek", "lgbtq") else 1.0
+    df.loc[1, "Greek"] = 1.0
+    df.loc[2, "lgbtq"] = 1.0
+    df.loc[3, "man men"] = 0.0
+    return IdentityFilter.from_dataframe(df)
+
+
+def test_no_answers_keeps_every_club():
+    identity_filter = scored_clubs()
+    assert identity_filter.eligible([]).all()
+    assert len(identity_filter.rank(np.ones(len(INTEREST_COLUMNS)), [], k=10)) == 4
+
+
+def test_maybe_or_no_answers_keep_opt_in_clubs():
+    # The app sends 'other' for both "Maybe" and "No"
+    assert scored_clubs().eligible(["other", "other"]).all()
+
+
+def test_explicit_opt_out_and_required_identities():
+    identity_filter = scored_clubs()
+    assert identity_filter.eligible(["no Greek"]).tolist() == [True, False, True, True]
+    assert identity_filter.eligible(["man men", "no lgbtq"]).tolist() == [True, True, False, False]
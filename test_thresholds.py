@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from Thresholds import (GREEK_LIFE_WORDS, MEN_WORDS, WOMEN_WORDS, gender_threshold, greek_life_threshold,
+                        lgbtq_threshold, race_threshold)
+
+RACE_COLUMNS = ["White European Italian", "Black African American", "Native American", "Hispanic", "Asian",
+                "Native Hawaiian or Other Pacific Islander"]
+
+
+# The iterrows() versions the scripts used before Thresholds.py, as references
+
+def legacy_race_threshold(thresh_value, race_list, dataframe):
+    for index, row in dataframe.iterrows():
+        race_vals = row[race_list].to_list()
+        maximum_race_val = max(race_vals)
+        minimum_race_val = min(race_vals)
+        max_val_index = race_vals.index(maximum_race_val)
+
+        for col in race_list:
+            dataframe.loc[index, col] = 0.0
+
+        if minimum_race_val >= thresh_value:
+            for col in race_list:
+                dataframe.loc[index, col] = 1.0
+        elif maximum_race_val >= thresh_value:
+            dataframe.loc[index, race_list[max_val_index]] = 1.0
+        elif maximum_race_val < thresh_value:
+            for col in race_list:
+                dataframe.loc[index, col] = 1
+
+
+def legacy_gender_threshold(dataframe, thresh_value):
+    for index, row in dataframe.iterrows():
+        found = None
+        for word in str(row["Description"]).lower().split():
+            if word in WOMEN_WORDS:
+                found = "woman"
+                break
+            elif word in MEN_WORDS:
+                found = "man"
+                break
+
+        if found == "man":
+            dataframe.loc[index, "woman women"] = 0.0
+            dataframe.loc[index, "man men"] = 1.0
+        elif found == "woman":
+            dataframe.loc[index, "woman women"] = 1.0
+            dataframe.loc[index, "man men"] = 0.0
+        else:
+            woman_score = dataframe.loc[index, "woman women"]
+            man_score = dataframe.loc[index, "man men"]
+            if (woman_score >= thresh_value and man_score >= thresh_value) or (woman_score < thresh_value and man_score < thresh_value):
+                dataframe.loc[index, "woman women"] = 1.0
+                dataframe.loc[index, "man men"] = 1.0
+            elif woman_score > man_score:
+                dataframe.loc[index, "woman women"] = 1.0
+                dataframe.loc[index, "man men"] = 0.0
+            else:
+                dataframe.loc[index, "woman women"] = 0.0
+                dataframe.loc[index, "man men"] = 1.0
+
+
+def legacy_greek_life_threshold(dataframe):
+    for index, row in dataframe.iterrows():
+        found = any(word in GREEK_LIFE_WORDS for word in str(row["Description"]).lower().split())
+        dataframe.loc[index, "Greek"] = 1.0 if found else 0.0
+
+
+def legacy_lgbtq_threshold(dataframe, thresh_value):
+    for index, row in dataframe.iterrows():
+        dataframe.loc[index, "lgbtq"] = 1.0 if row["lgbtq"] >= thresh_value else 0.0
+
+
+def random_clubs(rng, clubs=300):
+    """
+    Scores rounded to one decimal, so ties and scores exactly at a threshold come up, and
+    descriptions of space-separated keywords and filler words. No punctuation: the keyword
+    matcher deliberately also finds "women," or "(greek)", which the old split() missed.
+    """
+    words = sorted(WOMEN_WORDS | MEN_WORDS | GREEK_LIFE_WORDS) + ["club", "students", "Women", "GREEK", "welcome",
+                                                                  "womanly", "menu", "nan"]
+    df = pd.DataFrame({"Club Name": [f"Club {i}" for i in range(clubs)]})
+    for column in RACE_COLUMNS + ["woman women", "man men", "Greek", "lgbtq"]:
+        df[column] = rng.integers(0, 11, clubs) / 10
+    df["Description"] = [" ".join(rng.choice(words, rng.integers(0, 6))) for _ in range(clubs)]
+    df.loc[0, "Description"] = np.nan
+    df.loc[1, "Description"] = ""
+    return df
+
+
+def test_thresholds_match_legacy_iterrows():
+    df = random_clubs(np.random.default_rng(0))
+    expected = df.copy()
+
+    race_threshold(0.6, RACE_COLUMNS, df)
+    gender_threshold(df, 0.575)
+    greek_life_threshold(df)
+    lgbtq_threshold(df, 0.65)
+
+    legacy_race_threshold(0.6, RACE_COLUMNS, expected)
+    legacy_gender_threshold(expected, 0.575)
+    legacy_greek_life_threshold(expected)
+    legacy_lgbtq_threshold(expected, 0.65)
+
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)